@@ -0,0 +1,43 @@
+"""report priority and deadline
+
+Revision ID: 3c1f0b7d9e42
+Revises: a918d5f07719
+Create Date: 2026-10-16 09:12:40.118302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.db.postgres import table_columns
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c1f0b7d9e42'
+down_revision: Union[str, Sequence[str], None] = 'a918d5f07719'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = table_columns(op.get_bind(), "reports")
+    if not columns:
+        return
+    if "priority" not in columns:
+        op.add_column(
+            "reports",
+            sa.Column("priority", sa.SmallInteger(), nullable=False, server_default="5"),
+        )
+    if "deadline" not in columns:
+        op.add_column("reports", sa.Column("deadline", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    columns = table_columns(op.get_bind(), "reports")
+    if "deadline" in columns:
+        op.drop_column("reports", "deadline")
+    if "priority" in columns:
+        op.drop_column("reports", "priority")
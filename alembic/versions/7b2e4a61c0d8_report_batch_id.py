@@ -0,0 +1,36 @@
+"""report batch id
+
+Revision ID: 7b2e4a61c0d8
+Revises: 3c1f0b7d9e42
+Create Date: 2026-10-16 11:40:05.532917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+from app.db.postgres import table_columns
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e4a61c0d8'
+down_revision: Union[str, Sequence[str], None] = '3c1f0b7d9e42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    columns = table_columns(op.get_bind(), "reports")
+    if columns and "batch_id" not in columns:
+        op.add_column("reports", sa.Column("batch_id", postgresql.UUID(as_uuid=True), nullable=True))
+        op.create_index(op.f("ix_reports_batch_id"), "reports", ["batch_id"], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if "batch_id" in table_columns(op.get_bind(), "reports"):
+        op.drop_index(op.f("ix_reports_batch_id"), table_name="reports")
+        op.drop_column("reports", "batch_id")
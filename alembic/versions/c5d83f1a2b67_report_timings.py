@@ -0,0 +1,59 @@
+"""report timings
+
+Revision ID: c5d83f1a2b67
+Revises: 7b2e4a61c0d8
+Create Date: 2026-10-16 14:05:51.207466
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c5d83f1a2b67'
+down_revision: Union[str, Sequence[str], None] = '7b2e4a61c0d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("reports") or inspector.has_table("report_timings"):
+        return
+    op.create_table(
+        "report_timings",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("report_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("template_id", sa.String(length=100), nullable=False),
+        sa.Column("stage", sa.String(length=50), nullable=False),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("duration_ms", sa.Float(), nullable=False),
+        sa.Column("queue_wait_ms", sa.Float(), nullable=True),
+        sa.Column("payload_bytes", sa.Integer(), nullable=True),
+        sa.Column("ok", sa.Boolean(), nullable=False),
+        sa.ForeignKeyConstraint(["report_id"], ["reports.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_report_timings_report_id"), "report_timings", ["report_id"], unique=False
+    )
+    op.create_index(
+        "ix_report_timings_template_stage",
+        "report_timings",
+        ["template_id", "stage", "started_at"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("report_timings"):
+        return
+    op.drop_index("ix_report_timings_template_stage", table_name="report_timings")
+    op.drop_index(op.f("ix_report_timings_report_id"), table_name="report_timings")
+    op.drop_table("report_timings")
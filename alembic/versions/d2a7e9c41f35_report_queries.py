@@ -0,0 +1,65 @@
+"""report queries
+
+Revision ID: d2a7e9c41f35
+Revises: c5d83f1a2b67
+Create Date: 2026-10-16 21:24:37.518302
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd2a7e9c41f35'
+down_revision: Union[str, Sequence[str], None] = 'c5d83f1a2b67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    inspector = sa.inspect(op.get_bind())
+    if not inspector.has_table("reports") or inspector.has_table("report_queries"):
+        return
+    op.create_table(
+        "report_queries",
+        sa.Column("id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("report_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("template_id", sa.String(length=100), nullable=False),
+        sa.Column("stage", sa.String(length=50), nullable=False),
+        sa.Column("fingerprint", sa.String(length=16), nullable=False),
+        sa.Column("statement", sa.Text(), nullable=False),
+        sa.Column("params_hash", sa.String(length=16), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("duration_ms", sa.Float(), nullable=False),
+        sa.Column("rows", sa.Integer(), nullable=True),
+        sa.Column("bytes", sa.BigInteger(), nullable=True),
+        sa.Column("retries", sa.SmallInteger(), nullable=False),
+        sa.Column("cached", sa.Boolean(), nullable=False),
+        sa.Column("ok", sa.Boolean(), nullable=False),
+        sa.Column("reports", sa.SmallInteger(), nullable=False),
+        sa.Column("execution_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.ForeignKeyConstraint(["report_id"], ["reports.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        op.f("ix_report_queries_report_id"), "report_queries", ["report_id"], unique=False
+    )
+    op.create_index(
+        "ix_report_queries_started_template",
+        "report_queries",
+        ["started_at", "template_id"],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    if not sa.inspect(op.get_bind()).has_table("report_queries"):
+        return
+    op.drop_index("ix_report_queries_started_template", table_name="report_queries")
+    op.drop_index(op.f("ix_report_queries_report_id"), table_name="report_queries")
+    op.drop_table("report_queries")
@@ -1,12 +1,16 @@
+from datetime import UTC, datetime, timedelta
 from typing import Any
 
-from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
 from sqlalchemy.orm import Session
 
 from ..core.config import settings
 from ..deps import get_db_dep, require_admin
-from ..models import Report, ReportStatus, User
+from ..models import Report, ReportQuery, ReportStatus, ReportTiming, User
+from ..services import profiling, query_log, timings
+from ..services.placeholder_cache import placeholder_cache
 from ..services.templates_repo import registry
+from ..tasks import generate_report_async
 
 router = APIRouter(
     prefix="/admin",
@@ -92,6 +96,37 @@ def get_cached_assets(template_id: str, include_bodies: bool = False):
     )
 
 
+@router.get("/templates/{template_id}/cache")
+def get_placeholder_cache(template_id: str):
+    """Placeholder cache settings and hit/miss counters for a template."""
+    tmpl = registry.get_template(template_id)
+    if not tmpl:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    return _ok(
+        template_id=template_id,
+        ttl=placeholder_cache.ttl_for(tmpl),
+        stats=placeholder_cache.stats(template_id),
+    )
+
+
+@router.delete("/templates/{template_id}/cache")
+def clear_placeholder_cache(template_id: str):
+    return _ok(template_id=template_id, cleared=placeholder_cache.clear(template_id))
+
+
+@router.post("/templates/{template_id}/profile")
+def profile_template_runs(
+    template_id: str,
+    runs: int = Query(1, ge=0, le=100, description="Reports to profile; 0 disarms"),
+):
+    """Profile the fetch and render stages of the next ``runs`` reports of a template."""
+    tmpl = registry.get_template(template_id)
+    if not tmpl:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Template not found")
+    profiling.arm_template(template_id, runs)
+    return _ok(template_id=template_id, runs=profiling.remaining_runs(template_id))
+
+
 @router.get("/reports")
 def admin_list_reports(
     db: Session = Depends(get_db_dep),
@@ -187,4 +222,131 @@ def admin_get_report(
     if include_bodies:
         payload["output_content"] = report.output_content or ""
 
+    payload["profile"] = profiling.artifacts(str(report.id))
+    payload["timings"] = [
+        {
+            "stage": t.stage,
+            "started_at": t.started_at,
+            "duration_ms": t.duration_ms,
+            "queue_wait_ms": t.queue_wait_ms,
+            "payload_bytes": t.payload_bytes,
+            "ok": t.ok,
+        }
+        for t in (
+            db.query(ReportTiming)
+            .filter(ReportTiming.report_id == report.id)
+            .order_by(ReportTiming.started_at)
+        )
+    ]
+
+    payload["queries"] = [
+        {
+            "stage": q.stage,
+            "fingerprint": q.fingerprint,
+            "statement": q.statement,
+            "params_hash": q.params_hash,
+            "started_at": q.started_at,
+            "duration_ms": q.duration_ms,
+            "rows": q.rows,
+            "bytes": q.bytes,
+            "retries": q.retries,
+            "cached": q.cached,
+            "ok": q.ok,
+            "shared_by_reports": q.reports,
+        }
+        for q in (
+            db.query(ReportQuery)
+            .filter(ReportQuery.report_id == report.id)
+            .order_by(ReportQuery.started_at)
+        )
+    ]
+
     return _ok(report=payload)
+
+
+def _get_report(db: Session, hash_id: str) -> Report:
+    report = db.query(Report).filter(Report.hash_id == hash_id).first()
+    if not report:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
+    return report
+
+
+@router.post("/reports/{hash_id}/profile")
+def profile_report(hash_id: str, db: Session = Depends(get_db_dep)):
+    """Re-run a report with its fetch and render stages profiled.
+
+    Previous artifacts are discarded; download the new ones from the GET endpoint once the
+    report is generated again.
+    """
+    report = _get_report(db, hash_id)
+    if report.status == ReportStatus.PENDING:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Report is running")
+
+    profiling.clear(str(report.id))
+    profiling.arm_report(str(report.id))
+    report.status = ReportStatus.PENDING
+    report.updated_at = datetime.now(UTC)
+    db.add(report)
+    db.commit()
+    # The original deadline has passed or will; an admin re-run is never dropped.
+    generate_report_async(
+        str(report.template_id), dict(report.input_args), str(report.id), report.priority
+    )
+    return _ok(hash_id=str(report.hash_id), status=report.status.value)
+
+
+@router.get("/reports/{hash_id}/profile")
+def download_report_profile(
+    hash_id: str,
+    fmt: str | None = Query(None, alias="format", pattern="^(pstats|collapsed)$"),
+    stage: str | None = Query(None, description="fetch_placeholders or generate_html"),
+    db: Session = Depends(get_db_dep),
+):
+    """Download a report's profile: merged pstats, or collapsed stacks for flame graphs."""
+    report = _get_report(db, hash_id)
+    try:
+        body, ext = profiling.load(str(report.id), fmt=fmt, stage=stage)
+    except FileNotFoundError as err:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="No profile for this report"
+        ) from err
+    filename = f"report_{report.template_id}_{report.hash_id.hex[:8]}{ext}"
+    return Response(
+        content=body,
+        media_type="text/plain" if ext == ".collapsed" else "application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/timings")
+def admin_stage_timings(
+    db: Session = Depends(get_db_dep),
+    template_id: str | None = Query(None, description="Filter by template_id"),
+    stage: str | None = Query(None, description="Filter by stage, e.g. fetch_placeholders"),
+    hours: float = Query(24, gt=0, le=24 * 90, description="Window, in hours, ending now"),
+):
+    """p50/p95/p99 stage duration and queue wait per template and stage."""
+    since = datetime.now(UTC) - timedelta(hours=hours)
+    return _ok(
+        since=since,
+        hours=hours,
+        results=timings.percentiles(db, since, template_id=template_id, stage=stage),
+    )
+
+
+@router.get("/queries")
+def admin_top_queries(
+    db: Session = Depends(get_db_dep),
+    template_id: str | None = Query(None, description="Filter by template_id"),
+    order: str = Query("total", pattern="^(total|avg|p95|count)$"),
+    hours: float = Query(24, gt=0, le=24 * 90, description="Window, in hours, ending now"),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """Template queries by total execution time (or avg, p95, count) across all templates."""
+    since = datetime.now(UTC) - timedelta(hours=hours)
+    return _ok(
+        since=since,
+        hours=hours,
+        order=order,
+        results=query_log.top(db, since, template_id=template_id, order=order, limit=limit),
+    )
@@ -1,39 +1,268 @@
+import uuid
 from uuid import UUID
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from sqlalchemy import func, insert
 from sqlalchemy.orm import Session
 
+from ..core import metrics, tracing
 from ..core.config import settings
 from ..deps import get_current_user, get_db_dep
-from ..models import Report
-from ..schemas import ReportCreate, ReportOut
+from ..models import Report, ReportStatus
+from ..schemas import (
+    ReportBatchCreate,
+    ReportBatchOut,
+    ReportBatchStatusOut,
+    ReportCreate,
+    ReportOut,
+)
+from ..services import coalescing
+from ..services.templates_repo import registry
 from ..services.validator import ValidationError, Validator
-from ..tasks import generate_report_async
+from ..tasks import generate_report_async, generate_reports_async, report_signatures
 
 router = APIRouter(prefix="/reports", tags=["reports"])
 
 
+def _report_out(r: Report) -> ReportOut:
+    pdf_url = (
+        f"{settings.BASE_URL.rstrip('/')}{settings.MEDIA_URL}/{r.output_file}.pdf"
+        if r.output_file
+        else None
+    )
+    return ReportOut(
+        hash_id=r.hash_id,
+        status=r.status.value,
+        pdf_url=pdf_url,
+    )
+
+
+def _existing_out(db: Session, hash_id: str) -> ReportOut:
+    r = db.query(Report).filter(Report.hash_id == hash_id).first()
+    if not r:
+        # The first submission has claimed the run but not committed its row yet.
+        return ReportOut(hash_id=UUID(hash_id), status="P")
+    return _report_out(r)
+
+
+def _priority(payload: ReportCreate, tmpl: dict | None = None) -> int:
+    if payload.priority is not None:
+        return payload.priority
+    tmpl = tmpl or registry.get_template(payload.template_id) or {}
+    return int(tmpl.get("priority", settings.REPORT_DEFAULT_PRIORITY))
+
+
 @router.post("", response_model=ReportOut)
 def create_report(
     payload: ReportCreate,
     db: Session = Depends(get_db_dep),
     user=Depends(get_current_user),
+    idempotency_key: str | None = Header(None, alias="Idempotency-Key", max_length=255),
+    traceparent: str | None = Header(None),
 ):
-    """Create a report request (auth required)."""
+    """Create a report request (auth required).
+
+    Identical in-flight requests share one run. Retries carrying the same
+    ``Idempotency-Key`` header return the report created by the first attempt; reusing the
+    key for a different request is rejected with 422. A W3C
+    ``traceparent`` header joins the report's spans to the caller's trace.
+    """
+    with tracing.span(
+        "reports.create_report", parent=traceparent, template_id=payload.template_id
+    ) as span:
+        out = _create_report(payload, db, user, idempotency_key)
+        if span is not None:
+            span.set_attribute("hash_id", str(out.hash_id))
+        return out
+
+
+def _create_report(
+    payload: ReportCreate, db: Session, user, idempotency_key: str | None
+) -> ReportOut:
+    request_fp = None
+    if idempotency_key:
+        request_fp = coalescing.request_fingerprint(
+            payload.template_id, payload.input_args, payload.priority, payload.deadline
+        )
+        existing = coalescing.lookup_idempotent(user.id, idempotency_key)
+        if existing:
+            hash_id, stored_fp = existing
+            if stored_fp and stored_fp != request_fp:
+                raise HTTPException(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    detail="Idempotency-Key was already used with a different request",
+                )
+            return _existing_out(db, hash_id)
+
     try:
         _, process_args = Validator(payload.template_id, payload.input_args).validate()
     except ValidationError as err:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(err)) from err
 
-    r = Report(user_id=user.id, template_id=payload.template_id, input_args=process_args)
-    db.add(r)
-    db.commit()
+    priority = _priority(payload)
+
+    report_id, hash_id = uuid.uuid4(), uuid.uuid4()
+    if settings.REPORT_COALESCING:
+        fp = coalescing.fingerprint(payload.template_id, process_args)
+        existing = coalescing.claim(fp, str(report_id), str(hash_id), priority, payload.deadline)
+        if existing:
+            if idempotency_key:
+                coalescing.remember_idempotent(user.id, idempotency_key, existing, request_fp)
+            metrics.reports_submitted.labels(payload.template_id, "coalesced").inc()
+            return _existing_out(db, existing)
+
+    r = Report(
+        id=report_id,
+        hash_id=hash_id,
+        user_id=user.id,
+        template_id=payload.template_id,
+        input_args=process_args,
+        priority=priority,
+        deadline=payload.deadline,
+    )
+    try:
+        db.add(r)
+        db.commit()
+    except Exception:
+        coalescing.finish(str(report_id), ok=False)
+        raise
     db.refresh(r)
+    if idempotency_key:
+        coalescing.remember_idempotent(user.id, idempotency_key, str(r.hash_id), request_fp)
 
-    generate_report_async(str(r.template_id), dict(r.input_args), str(r.id))
+    try:
+        generate_report_async(
+            str(r.template_id), dict(r.input_args), str(r.id), r.priority, r.deadline
+        )
+    except Exception:
+        coalescing.finish(str(report_id), ok=False)
+        raise
+    metrics.reports_submitted.labels(payload.template_id, "single").inc()
     return ReportOut(hash_id=r.hash_id, status=r.status.value)
 
 
+@router.post("/batch", response_model=ReportBatchOut)
+def create_reports_batch(
+    payload: ReportBatchCreate,
+    db: Session = Depends(get_db_dep),
+    user=Depends(get_current_user),
+    traceparent: str | None = Header(None),
+):
+    """Create many report requests in one call (auth required).
+
+    All items are validated against a single read of the templates index; if any item is
+    invalid nothing is created. Rows are inserted in one transaction and the pipelines are
+    enqueued as one Celery group. Items are not coalesced with runs already in flight, so
+    every item belongs to the batch.
+    """
+    with tracing.span(
+        "reports.create_reports_batch", parent=traceparent, items=len(payload.items)
+    ) as span:
+        out = _create_reports_batch(payload, db, user)
+        if span is not None:
+            span.set_attribute("batch_id", str(out.batch_id))
+        return out
+
+
+def _create_reports_batch(payload: ReportBatchCreate, db: Session, user) -> ReportBatchOut:
+    templates = {t.get("id"): t for t in registry.list_templates()}
+    if any(item.template_id not in templates for item in payload.items):
+        templates = {t.get("id"): t for t in registry.sync_index().get("templates", [])}
+
+    validated, errors = [], []
+    for i, item in enumerate(payload.items):
+        tmpl = templates.get(item.template_id)
+        try:
+            if not tmpl:
+                raise ValidationError(f"Unknown template_id: {item.template_id}")
+            _, process_args = Validator(item.template_id, item.input_args, template=tmpl).validate()
+        except ValidationError as err:
+            errors.append({"index": i, "detail": str(err)})
+            continue
+        validated.append((item, tmpl, process_args))
+    if errors:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=errors)
+
+    batch_id = uuid.uuid4()
+    rows, entries, outs, claimed = [], [], [], []
+    for item, tmpl, process_args in validated:
+        report_id, hash_id = uuid.uuid4(), uuid.uuid4()
+        priority = _priority(item, tmpl)
+        # Batch items always get their own row so the batch can be polled; they only claim
+        # free fingerprints, letting later single submissions attach to them.
+        if settings.REPORT_COALESCING:
+            fp = coalescing.fingerprint(item.template_id, process_args)
+            if not coalescing.claim(fp, str(report_id), str(hash_id), priority, item.deadline):
+                claimed.append(str(report_id))
+
+        rows.append(
+            {
+                "id": report_id,
+                "hash_id": hash_id,
+                "user_id": user.id,
+                "template_id": item.template_id,
+                "input_args": process_args,
+                "priority": priority,
+                "deadline": item.deadline,
+                "batch_id": batch_id,
+            }
+        )
+        entries.append(
+            {
+                "template_id": item.template_id,
+                "args": process_args,
+                "report_id": str(report_id),
+                "priority": priority,
+                "deadline": item.deadline,
+                "template": tmpl,
+            }
+        )
+        outs.append(ReportOut(hash_id=hash_id, status=ReportStatus.PENDING.value))
+
+    if rows:
+        try:
+            db.execute(insert(Report), rows)
+            db.commit()
+        except Exception:
+            db.rollback()
+            for report_id in claimed:
+                coalescing.finish(report_id, ok=False)
+            raise
+        try:
+            generate_reports_async(report_signatures(entries))
+        except Exception:
+            for report_id in claimed:
+                coalescing.finish(report_id, ok=False)
+            raise
+        for entry in entries:
+            metrics.reports_submitted.labels(entry["template_id"], "batch").inc()
+
+    return ReportBatchOut(batch_id=batch_id, reports=outs)
+
+
+@router.get("/batch/{batch_id}", response_model=ReportBatchStatusOut)
+def get_reports_batch(
+    batch_id: UUID,
+    db: Session = Depends(get_db_dep),
+    user=Depends(get_current_user),
+):
+    """Poll the reports created by one batch submission (owner or admin)."""
+    q = db.query(Report).filter(Report.batch_id == batch_id)
+    if not user.is_admin:
+        q = q.filter(Report.user_id == user.id)
+    reports = q.order_by(Report.created_at).all()
+    if not reports:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Batch not found")
+
+    counts = dict(q.with_entities(Report.status, func.count()).group_by(Report.status).all())
+    return ReportBatchStatusOut(
+        batch_id=batch_id,
+        total=len(reports),
+        counts={s.value: n for s, n in counts.items()},
+        reports=[_report_out(r) for r in reports],
+    )
+
+
 @router.get("/{hash_id}", response_model=ReportOut)
 def get_report(
     hash_id: UUID,
@@ -44,13 +273,4 @@ def get_report(
     if not r:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Report not found")
 
-    pdf_url = (
-        f"{settings.BASE_URL.rstrip('/')}{settings.MEDIA_URL}/{r.output_file}.pdf"
-        if r.output_file
-        else None
-    )
-    return ReportOut(
-        hash_id=r.hash_id,
-        status=r.status.value,
-        pdf_url=pdf_url,
-    )
+    return _report_out(r)
@@ -1,9 +1,24 @@
+import os
+import time
+
 from celery import Celery
+from celery.signals import (
+    before_task_publish,
+    task_postrun,
+    task_prerun,
+    worker_init,
+    worker_process_shutdown,
+)
 
+from .core import metrics, tracing
 from .core.config import settings
 from .core.logging import configure_logging
+from .core.serialization import SERIALIZER_NAME, register_serializer
 
 configure_logging()
+register_serializer()
+
+serializer = SERIALIZER_NAME if settings.CELERY_SERIALIZER == "msgpack" else "json"
 
 celery_app = Celery(
     "reports",
@@ -15,15 +30,86 @@
 
 celery_app.conf.update(
     broker_connection_retry_on_startup=True,
-    task_serializer="json",
-    result_serializer="json",
-    accept_content=["json"],
+    task_serializer=serializer,
+    result_serializer=serializer,
+    # Accept both so workers and web can be switched over one at a time.
+    accept_content=["json", SERIALIZER_NAME],
+    result_accept_content=["json", SERIALIZER_NAME],
     timezone="UTC",
     enable_utc=True,
     worker_hijack_root_logger=False,
+    # Later stages of a chain are sent at the priority the first stage was delivered with.
+    task_inherit_parent_priority=True,
 )
 
 
+# Report priorities run from 0 (background) to 9 (most urgent). Redis serves lower numbers
+# first and needs one sub-queue per step; AMQP brokers need a queue-level maximum instead.
+PRIORITY_MAX = 9
+_redis_broker = settings.CELERY_BROKER_URL.startswith("redis")
+
+if _redis_broker:
+    celery_app.conf.broker_transport_options = {
+        "priority_steps": list(range(PRIORITY_MAX + 1)),
+        "sep": ":",
+        "queue_order_strategy": "priority",
+    }
+else:
+    celery_app.conf.task_queue_max_priority = PRIORITY_MAX
+
+
+def broker_priority(priority: int) -> int:
+    """Map a report priority onto the broker's scale."""
+    priority = max(0, min(PRIORITY_MAX, priority))
+    return PRIORITY_MAX - priority if _redis_broker else priority
+
+
+@before_task_publish.connect
+def _stamp_headers(headers=None, **kwargs):
+    # enqueued_at lets each stage measure how long its message waited in the broker.
+    if headers is not None:
+        headers["enqueued_at"] = time.time()
+        traceparent = tracing.current_traceparent()
+        if traceparent:
+            headers["traceparent"] = traceparent
+
+
+_trace_tokens: dict = {}
+
+
+@task_prerun.connect
+def _attach_trace_context(task_id=None, task=None, **kwargs):
+    # Stages of one report (and the request that created it) share the submitter's trace.
+    token = tracing.attach(getattr(task.request, "traceparent", None))
+    if token is not None:
+        _trace_tokens[task_id] = token
+
+
+@task_postrun.connect
+def _detach_trace_context(task_id=None, **kwargs):
+    tracing.detach(_trace_tokens.pop(task_id, None))
+
+
+# Stage-specialized queues so I/O-bound fetches, CPU-bound rendering and slow PDF calls can be
+# served by separately sized worker pools (see "Worker profiles" in the README).
+STAGE_QUEUES = {
+    "app.tasks.validate_report": "validate",
+    "app.tasks.fetch_placeholders": "fetch",
+    "app.tasks.fetch_placeholders_batch": "fetch",
+    "app.tasks.generate_html": "render",
+    "app.tasks.generate_pdf": "pdf",
+    "app.tasks.update_report_status": "status",
+    "app.tasks.handle_errors": "status",
+    "app.tasks.run_report_pipeline": "pipeline",
+}
+
+if settings.CELERY_STAGE_QUEUES:
+    celery_app.conf.task_routes = {
+        task: {"queue": f"{settings.CELERY_QUEUE_PREFIX}.{queue}"}
+        for task, queue in STAGE_QUEUES.items()
+    }
+
+
 celery_app.conf.beat_schedule.update(
     {
         "sync-templates-index": {
@@ -36,3 +122,58 @@
         },
     }
 )
+
+
+def broker_queues() -> list[str]:
+    """Queues the report workers consume (stage queues plus Celery's default)."""
+    queues = [celery_app.conf.task_default_queue]
+    if settings.CELERY_STAGE_QUEUES:
+        for queue in STAGE_QUEUES.values():
+            name = f"{settings.CELERY_QUEUE_PREFIX}.{queue}"
+            if name not in queues:
+                queues.append(name)
+    return queues
+
+
+def queue_depth_collector() -> metrics.QueueDepthCollector | None:
+    if not _redis_broker:
+        return None
+    options = celery_app.conf.broker_transport_options
+    return metrics.QueueDepthCollector(
+        settings.CELERY_BROKER_URL,
+        broker_queues(),
+        options.get("priority_steps", [0]),
+        options.get("sep", ":"),
+    )
+
+
+@worker_init.connect
+def _start_worker_metrics(**kwargs):
+    # Runs in the parent before the pool forks, so children write to a clean directory.
+    metrics.reset_multiproc_dir()
+    if settings.WORKER_METRICS_PORT:
+        metrics.serve(settings.WORKER_METRICS_PORT)
+
+
+@worker_process_shutdown.connect
+def _mark_metrics_process_dead(pid=None, **kwargs):
+    metrics.mark_process_dead(pid or os.getpid())
+
+
+if settings.REPORT_TIMINGS:
+    celery_app.conf.beat_schedule["purge-report-timings"] = {
+        "task": "app.tasks.purge_report_timings",
+        "schedule": 24 * 3600,
+    }
+
+if settings.REPORT_QUERY_LOG:
+    celery_app.conf.beat_schedule["purge-report-queries"] = {
+        "task": "app.tasks.purge_report_queries",
+        "schedule": 24 * 3600,
+    }
+
+if settings.PAYLOAD_STORE == "file":
+    celery_app.conf.beat_schedule["purge-payloads"] = {
+        "task": "app.tasks.purge_payloads",
+        "schedule": 3600,
+    }
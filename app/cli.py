@@ -1,3 +1,6 @@
+import json
+import statistics
+import time
 from datetime import timedelta
 from getpass import getpass
 
@@ -7,6 +10,16 @@
 from .core.security import create_access_token, get_password_hash
 from .db.postgres import Base, SessionLocal, engine
 from .models import User
+from .services import aggregator
+from .services.db.fixtures import (
+    FixtureMissingError,
+    FixtureStore,
+    RecordingDBAdapter,
+    ReplayDBAdapter,
+)
+from .services.db.sources import data_sources
+from .services.templates_repo import registry
+from .services.validator import ValidationError, Validator
 
 app = typer.Typer(help="Management commands")
 
@@ -213,5 +226,93 @@ def revoke_admin(email: str = typer.Option(..., "--email", "-e", help="User emai
         db.close()
 
 
+@app.command("record-fixtures")
+def record_fixtures(
+    template_id: str = typer.Option(..., "--template", "-t", help="Template id"),
+    args: str = typer.Option("{}", "--args", "-a", help="Report input args as JSON"),
+    out: str = typer.Option(..., "--out", "-o", help="Fixture directory to write"),
+):
+    """Run a template's data fetch on its real data source and record every query result."""
+    try:
+        _, process_args = Validator(template_id, json.loads(args)).validate()
+    except (ValidationError, json.JSONDecodeError) as err:
+        typer.secho(f"Error: {err}", fg=typer.colors.RED)
+        raise typer.Exit(code=1) from err
+
+    store = FixtureStore(out)
+    source = data_sources.source_for(registry.get_template(template_id))
+    pool = data_sources.pool(source)
+    error = None
+    try:
+        with pool.connection() as client:
+            aggregator.run_scripts(
+                template_id, process_args, RecordingDBAdapter(client, store, pool=pool)
+            )
+    except Exception as err:
+        error = f"{type(err).__name__}: {err}"
+    store.save(
+        template_id=template_id,
+        process_args=process_args,
+        etag=registry.get_template_etag(template_id),
+        source=source,
+        error=error,
+    )
+
+    queries = store.index["queries"].values()
+    rows = sum(q.get("rows") or 0 for q in queries)
+    typer.echo(f"Recorded {len(queries)} queries ({rows} rows) to {out}")
+    if error:
+        typer.secho(
+            f"Template raised {error}; recorded the queries run before it", fg=typer.colors.YELLOW
+        )
+        raise typer.Exit(code=1)
+
+
+@app.command("replay-fixtures")
+def replay_fixtures(
+    directory: str = typer.Argument(..., help="Fixture directory written by record-fixtures"),
+    repeat: int = typer.Option(1, "--repeat", "-r", min=1, help="Runs to time"),
+    render: bool = typer.Option(False, "--render", help="Also render template.html"),
+    output: str | None = typer.Option(None, "--output", "-o", help="Write placeholders as JSON"),
+):
+    """Run a template's logic against recorded fixtures, with no database, and time it."""
+    store = FixtureStore.load(directory)
+    template_id = store.template_id
+    etag = registry.get_template_etag(template_id)
+    if store.index.get("etag") and etag != store.index["etag"]:
+        typer.secho(
+            "Template changed since recording; new or changed queries will not replay",
+            fg=typer.colors.YELLOW,
+        )
+
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        try:
+            placeholders = aggregator.run_scripts(
+                template_id, store.process_args, ReplayDBAdapter(store)
+            )
+        except Exception as err:
+            cause = err.__cause__ if isinstance(err.__cause__, FixtureMissingError) else err
+            typer.secho(f"Error: {cause}", fg=typer.colors.RED)
+            raise typer.Exit(code=1) from err
+        if render:
+            aggregator.render_html(template_id, placeholders)
+        times.append((time.perf_counter() - started) * 1000)
+
+    _print_kv(
+        f"Replayed {template_id} x{repeat}",
+        {
+            "min ms": f"{min(times):.1f}",
+            "median ms": f"{statistics.median(times):.1f}",
+            "max ms": f"{max(times):.1f}",
+            "placeholders": ", ".join(sorted(placeholders)),
+        },
+    )
+    if output:
+        with open(output, "w", encoding="utf-8") as fh:
+            json.dump(placeholders, fh, indent=2, default=str)
+
+
 if __name__ == "__main__":
     app()
@@ -1,4 +1,5 @@
 import os
+from typing import Any
 
 from pydantic import computed_field
 from pydantic_settings import BaseSettings
@@ -16,12 +17,65 @@ class Settings(BaseSettings):
     POSTGRES_USER: str = "appuser"
     POSTGRES_PASSWORD: str = "apppass"
     MSSQL_DSN: str = ""
+    DATA_SOURCES: dict[str, dict[str, Any]] = {}  # named sources, see services/db/sources.py
+    # Pool defaults for every data source (per-source "pool_size" etc. override them)
+    MSSQL_POOL_SIZE: int = 5  # connections kept per worker process (report + read_many workers)
+    MSSQL_POOL_IDLE_TIMEOUT: int = 300  # seconds before an idle connection is closed
+    MSSQL_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+    MSSQL_POOL_PRE_PING: bool = True
+    DB_RETRY_ATTEMPTS: int = 3  # attempts for transient DB errors; permanent errors fail at once
+    DB_RETRY_BACKOFF_BASE: float = 0.5
+    DB_RETRY_BACKOFF_MAX: float = 8.0
+    DB_BREAKER_THRESHOLD: int = 5  # transient failures within the window that open the circuit
+    DB_BREAKER_WINDOW: int = 60
+    DB_BREAKER_COOLDOWN: int = 30
+    REPORT_COALESCING: bool = True  # attach identical submissions to the run in flight
+    REPORT_COALESCE_INFLIGHT_TTL: int = 900  # upper bound for a run to stay attachable
+    REPORT_COALESCE_WINDOW_SECONDS: int = 0  # keep attaching to a finished run this long
+    IDEMPOTENCY_KEY_TTL: int = 24 * 3600
+    REPORT_PIPELINE_MODE: str = "chained"  # "chained" (task per stage) or "fused" (one task)
+    PAYLOAD_STORE: str = ""  # "", "redis" or "file": claim-check for placeholders/HTML
+    PAYLOAD_STORE_DIR: str = "./payloads"  # must be shared by all workers for "file"
+    PAYLOAD_STORE_TTL: int = 6 * 3600
+    PAYLOAD_COMPRESS_MIN_BYTES: int = 1024
+    REPORT_PARK_MAX_RETRIES: int = 10  # times a report is re-queued while a circuit is open
+    REPORT_DEFAULT_PRIORITY: int = 5  # 0 (background) .. 9 (most urgent); map.json can override
+    REPORT_DEADLINE_POLICY: str = "drop"  # past-deadline stages: "drop", "downgrade" or "ignore"
+    REPORT_BATCH_MAX_ITEMS: int = 1000  # reports per POST /api/reports/batch
+    TEMPLATE_CONCURRENCY_LIMIT: int = 0  # fetches per template at once; 0 = no limit
+    SOURCE_CONCURRENCY_LIMIT: int = 0  # fetches per data source at once; 0 = no limit
+    CONCURRENCY_LEASE_SECONDS: int = 900  # a crashed worker's slot is freed after this long
+    CONCURRENCY_RETRY_COUNTDOWN: int = 5  # base delay before re-queueing a throttled fetch
+    CONCURRENCY_MAX_RETRIES: int = 120
+    REPORT_TIMINGS: bool = True  # record per-stage durations into report_timings
+    REPORT_TIMINGS_RETENTION_DAYS: int = 30
+    REPORT_QUERY_LOG: bool = True  # record each template query into report_queries
+    REPORT_QUERY_LOG_RETENTION_DAYS: int = 30
+    METRICS_ENABLED: bool = True  # serve Prometheus metrics on /metrics
+    WORKER_METRICS_PORT: int = 0  # Celery workers serve metrics on this port; 0 = off
+    TRACING_EXPORTER: str = ""  # "", "log", "jsonl" or "module:factory"
+    TRACING_JSONL_PATH: str = "./traces/spans.jsonl"
+    TRACING_SAMPLE_RATE: float = 1.0  # share of new traces exported
+    PROFILE_MODE: str = "cprofile"  # "cprofile" (.pstats) or "sampling" (collapsed stacks)
+    PROFILE_DIR: str = "./profiles"  # must be shared by workers and the API
+    PROFILE_SAMPLE_INTERVAL_MS: float = 5.0
+    PROFILE_FLAG_TTL: int = 24 * 3600  # armed report/template flags expire after this long
+    DB_READ_MANY_WORKERS: int = 4  # concurrent queries per DBAdapter.read_many() call
+    DB_FETCH_BATCH_SIZE: int = 10_000  # rows per fetchmany() in streaming/columnar reads
+    QUERY_CACHE_LOCK_TIMEOUT: int = 120  # seconds a single-flight leader may hold the lock
+    QUERY_CACHE_WAIT_TIMEOUT: int = 60  # seconds followers wait before querying themselves
+    QUERY_CACHE_MAX_BYTES: int = 32 * 1024 * 1024
     GENERATOR_HOST: str = "generator:3000"
     REQUEST_MAX_RETRIES: int = 3
     REQUEST_BACKOFF_FACTOR: float = 0.2
     REDIS_URL: str = "redis://localhost:6379/0"
     CELERY_BROKER_URL: str = "redis://localhost:6379/1"
     CELERY_RESULT_BACKEND: str = "redis://localhost:6379/2"
+    CELERY_STAGE_QUEUES: bool = True  # route each pipeline stage to "<prefix>.<stage>"
+    CELERY_QUEUE_PREFIX: str = "reports"
+    CELERY_SERIALIZER: str = "json"  # "json" or "msgpack" (compact, typed, compressed)
+    CELERY_COMPRESSION: str = "zstd"  # "zstd", "zlib" or "" for msgpack bodies
+    CELERY_COMPRESSION_MIN_BYTES: int = 16 * 1024
     LOAD_TEMPLATES_LOCAL: bool = (
         False  # Set True to load templates from local files instead of remote repository
     )
@@ -31,6 +85,11 @@ class Settings(BaseSettings):
     TEMPLATES_INDEX_URL: str = "https://raw.githubusercontent.com/<org>/<repo>/<branch>/map.json"
     GITHUB_TOKEN: str | None = None
     TEMPLATES_SYNC_INTERVAL_MINUTES: int = 5
+    TEMPLATE_CODE_CACHE_SIZE: int = 128  # compiled logic.py/test.py objects kept per process
+    JINJA_TEMPLATE_CACHE_SIZE: int = 64  # compiled template.html objects kept per process
+    JINJA_BYTECODE_CACHE: str = ""  # "", "fs" or "redis"; warms freshly forked workers
+    JINJA_BYTECODE_CACHE_DIR: str = "/tmp/nava2-jinja"
+    JINJA_BYTECODE_CACHE_TTL: int = 7 * 24 * 3600
     DOCS_URL: str | None = "/docs"
     REDOC_URL: str | None = "/redoc"
     OPENAPI_URL: str | None = "/openapi.json"
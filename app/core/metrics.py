@@ -0,0 +1,153 @@
+"""Prometheus metrics for the web app and Celery workers.
+
+Metrics are module-level collectors on the default registry. When ``PROMETHEUS_MULTIPROC_DIR``
+is set (required for prefork workers and multi-process uvicorn), every process writes its
+samples there and ``render()`` aggregates them with a ``MultiProcessCollector``. Workers serve
+their aggregate on ``WORKER_METRICS_PORT``; the web app serves ``/metrics``.
+"""
+
+from __future__ import annotations
+
+import glob
+import logging
+import os
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+MULTIPROC_DIR = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or os.environ.get(
+    "prometheus_multiproc_dir"
+)
+
+# Stage and DB latencies span milliseconds (cache hits) to minutes (large statements).
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+reports_submitted = Counter(
+    "nava_reports_submitted_total",
+    "Report requests accepted by the API.",
+    ["template_id", "mode"],
+)
+stage_duration = Histogram(
+    "nava_stage_duration_seconds",
+    "Wall time of one pipeline stage run.",
+    ["template_id", "stage"],
+    buckets=LATENCY_BUCKETS,
+)
+stage_failures = Counter(
+    "nava_stage_failures_total",
+    "Reports failed, by the stage that raised and the exception type.",
+    ["stage", "exception"],
+)
+cache_requests = Counter(
+    "nava_template_cache_requests_total",
+    "Template cache lookups (compiled code, Jinja templates, placeholders).",
+    ["cache", "result"],
+)
+db_query_duration = Histogram(
+    "nava_db_query_seconds",
+    "Time spent in data-source queries, retries included.",
+    ["source"],
+    buckets=LATENCY_BUCKETS,
+)
+generator_duration = Histogram(
+    "nava_generator_request_seconds",
+    "Latency of PDF generator HTTP calls.",
+    ["status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+
+class QueueDepthCollector:
+    """Reports pending messages per Celery queue, read from the Redis broker at scrape time."""
+
+    def __init__(
+        self, broker_url: str, queues: list[str], priority_steps: list[int], sep: str = ":"
+    ):
+        import redis
+
+        self.client = redis.Redis.from_url(broker_url)
+        self.queues = queues
+        self.priority_steps = priority_steps
+        self.sep = sep
+
+    def _keys(self, queue: str) -> list[str]:
+        # Kombu keeps one Redis list per priority step; step 0 uses the bare queue name.
+        return [queue if p == 0 else f"{queue}{self.sep}{p}" for p in self.priority_steps or [0]]
+
+    def _family(self) -> GaugeMetricFamily:
+        return GaugeMetricFamily(
+            "nava_queue_depth", "Messages waiting in each Celery queue.", labels=["queue"]
+        )
+
+    def describe(self):
+        # Lets the registry learn the metric name without a broker round trip.
+        yield self._family()
+
+    def collect(self):
+        gauge = self._family()
+        try:
+            pipe = self.client.pipeline()
+            for queue in self.queues:
+                for key in self._keys(queue):
+                    pipe.llen(key)
+            lengths = iter(pipe.execute())
+            for queue in self.queues:
+                gauge.add_metric([queue], sum(next(lengths) for _ in self._keys(queue)))
+        except Exception as e:
+            logger.debug("Queue depth unavailable: %s", e)
+        yield gauge
+
+
+_extra_collectors: list = []
+
+
+def register_collector(collector) -> None:
+    """Add a scrape-time collector (e.g. queue depth) to what this process exposes."""
+    _extra_collectors.append(collector)
+    if not MULTIPROC_DIR:
+        REGISTRY.register(collector)
+
+
+def registry() -> CollectorRegistry:
+    """Registry to expose: per-process default, or the aggregate of all processes."""
+    if not MULTIPROC_DIR:
+        return REGISTRY
+    reg = CollectorRegistry()
+    multiprocess.MultiProcessCollector(reg)
+    for collector in _extra_collectors:
+        reg.register(collector)
+    return reg
+
+
+def render(reg: CollectorRegistry | None = None) -> tuple[bytes, str]:
+    return generate_latest(reg or registry()), CONTENT_TYPE_LATEST
+
+
+def reset_multiproc_dir() -> None:
+    """Drop samples left by earlier runs; call once in the parent before forking."""
+    if not MULTIPROC_DIR:
+        return
+    os.makedirs(MULTIPROC_DIR, exist_ok=True)
+    for path in glob.glob(os.path.join(MULTIPROC_DIR, "*.db")):
+        os.remove(path)
+
+
+def mark_process_dead(pid: int) -> None:
+    if MULTIPROC_DIR:
+        multiprocess.mark_process_dead(pid)
+
+
+def serve(port: int, reg: CollectorRegistry | None = None) -> None:
+    start_http_server(port, registry=reg or registry())
+    logger.info("Serving worker metrics on :%s", port)
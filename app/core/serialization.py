@@ -0,0 +1,161 @@
+"""Compact Celery serializer: msgpack with extension types and size-based compression.
+
+Registered with kombu as ``nava-msgpack``. Besides plain msgpack types it round-trips
+datetimes, dates, times, timedeltas, Decimals, UUIDs, NumPy arrays/scalars and pandas
+DataFrames (as Arrow IPC); ``pd.NaT`` and ``pd.NA`` become nil. Bodies of at least
+``CELERY_COMPRESSION_MIN_BYTES`` are compressed with zlib or zstd (via pyarrow's codec) and
+tagged with a one-byte header.
+"""
+
+from __future__ import annotations
+
+import struct
+import uuid
+import zlib
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from typing import Any
+
+import msgpack
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from kombu.serialization import register
+
+from .config import settings
+
+CONTENT_TYPE = "application/x-nava-msgpack"
+SERIALIZER_NAME = "nava-msgpack"
+
+_EXT_DATETIME = 1
+_EXT_DATE = 2
+_EXT_TIME = 3
+_EXT_TIMEDELTA = 4
+_EXT_DECIMAL = 5
+_EXT_UUID = 6
+_EXT_NDARRAY = 7
+_EXT_DATAFRAME = 8
+
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+_ZSTD = b"\x02"
+_SIZE = struct.Struct("!Q")
+
+_IPC_OPTIONS = pa.ipc.IpcWriteOptions(compression="zstd")
+
+
+def encode_frame(df: pd.DataFrame, preserve_index: bool | None = False) -> bytes:
+    table = pa.Table.from_pandas(df, preserve_index=preserve_index)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema, options=_IPC_OPTIONS) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
+
+
+def decode_frame(data: bytes) -> pd.DataFrame:
+    return pa.ipc.open_stream(pa.py_buffer(data)).read_all().to_pandas()
+
+
+def _scalar(obj: np.generic) -> Any:
+    # .item() turns datetime64[ns] into an int and returns date/timedelta, which msgpack would
+    # not pass back through ``default``; go through pandas so the ext types below apply.
+    if isinstance(obj, np.datetime64):
+        return pd.Timestamp(obj)
+    if isinstance(obj, np.timedelta64):
+        return pd.Timedelta(obj)
+    return obj.item()
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, np.generic):
+        obj = _scalar(obj)
+    # Missing values are nil; pd.NaT would otherwise pass as a datetime.
+    if obj is None or obj is pd.NaT or obj is pd.NA:
+        return None
+    # datetime before date: datetime is a date subclass (pd.Timestamp is a datetime).
+    if isinstance(obj, datetime):
+        return msgpack.ExtType(_EXT_DATETIME, obj.isoformat().encode())
+    if isinstance(obj, date):
+        return msgpack.ExtType(_EXT_DATE, obj.isoformat().encode())
+    if isinstance(obj, time):
+        return msgpack.ExtType(_EXT_TIME, obj.isoformat().encode())
+    if isinstance(obj, timedelta):
+        return msgpack.ExtType(_EXT_TIMEDELTA, repr(obj.total_seconds()).encode())
+    if isinstance(obj, Decimal):
+        return msgpack.ExtType(_EXT_DECIMAL, str(obj).encode())
+    if isinstance(obj, uuid.UUID):
+        return msgpack.ExtType(_EXT_UUID, obj.bytes)
+    if isinstance(obj, np.ndarray):
+        if obj.dtype.hasobject:
+            return obj.tolist()
+        payload = (obj.dtype.str, list(obj.shape), np.ascontiguousarray(obj).tobytes())
+        return msgpack.ExtType(_EXT_NDARRAY, msgpack.packb(payload))
+    if isinstance(obj, pd.DataFrame):
+        return msgpack.ExtType(_EXT_DATAFRAME, encode_frame(obj, preserve_index=None))
+    if isinstance(obj, set | frozenset):
+        return list(obj)
+    if isinstance(obj, bool | int | float | str | bytes):
+        return obj
+    raise TypeError(f"Object of type {type(obj).__name__} is not msgpack serializable")
+
+
+def _ext_hook(code: int, data: bytes) -> Any:
+    if code == _EXT_DATETIME:
+        return datetime.fromisoformat(data.decode())
+    if code == _EXT_DATE:
+        return date.fromisoformat(data.decode())
+    if code == _EXT_TIME:
+        return time.fromisoformat(data.decode())
+    if code == _EXT_TIMEDELTA:
+        return timedelta(seconds=float(data.decode()))
+    if code == _EXT_DECIMAL:
+        return Decimal(data.decode())
+    if code == _EXT_UUID:
+        return uuid.UUID(bytes=data)
+    if code == _EXT_NDARRAY:
+        dtype, shape, buf = msgpack.unpackb(data)
+        return np.frombuffer(buf, dtype=np.dtype(dtype)).reshape(shape).copy()
+    if code == _EXT_DATAFRAME:
+        return decode_frame(data)
+    return msgpack.ExtType(code, data)
+
+
+def _compress(body: bytes) -> bytes:
+    if len(body) < settings.CELERY_COMPRESSION_MIN_BYTES:
+        return _RAW + body
+    if settings.CELERY_COMPRESSION == "zstd":
+        packed = pa.compress(body, codec="zstd", asbytes=True)
+        return _ZSTD + _SIZE.pack(len(body)) + packed
+    if settings.CELERY_COMPRESSION == "zlib":
+        return _ZLIB + zlib.compress(body, 6)
+    return _RAW + body
+
+
+def _decompress(blob: bytes) -> bytes:
+    marker = blob[:1]
+    if marker == _ZSTD:
+        (size,) = _SIZE.unpack_from(blob, 1)
+        return pa.decompress(blob[1 + _SIZE.size :], size, codec="zstd", asbytes=True)
+    if marker == _ZLIB:
+        return zlib.decompress(blob[1:])
+    return blob[1:]
+
+
+def dumps(obj: Any) -> bytes:
+    return _compress(msgpack.packb(obj, default=_default, use_bin_type=True, datetime=False))
+
+
+def loads(blob: bytes | str) -> Any:
+    if isinstance(blob, str):
+        blob = blob.encode("latin-1")
+    return msgpack.unpackb(_decompress(blob), ext_hook=_ext_hook, raw=False, strict_map_key=False)
+
+
+def register_serializer() -> None:
+    register(
+        SERIALIZER_NAME,
+        dumps,
+        loads,
+        content_type=CONTENT_TYPE,
+        content_encoding="binary",
+    )
@@ -0,0 +1,176 @@
+"""Minimal W3C trace-context tracing for the report pipeline."""
+
+from __future__ import annotations
+
+import importlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SpanContext:
+    trace_id: str
+    span_id: str
+    sampled: bool = True
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+
+@dataclass
+class Span:
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: str | None
+    sampled: bool
+    start: float = field(default_factory=time.time)
+    end: float | None = None
+    status: str = "ok"
+    error: str | None = None
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def context(self) -> SpanContext:
+        return SpanContext(self.trace_id, self.span_id, self.sampled)
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_dict(self) -> dict[str, Any]:
+        out = asdict(self)
+        out.pop("sampled")
+        out["duration_ms"] = ((self.end or time.time()) - self.start) * 1000
+        return out
+
+
+class LogExporter:
+    def export(self, span: Span) -> None:
+        logging.getLogger("app.tracing").info(
+            "span %s trace=%s id=%s parent=%s %.1fms %s %s",
+            span.name,
+            span.trace_id,
+            span.span_id,
+            span.parent_id,
+            ((span.end or span.start) - span.start) * 1000,
+            span.status,
+            span.attributes,
+        )
+
+
+class JsonlExporter:
+    """Appends spans to a JSON-lines file; safe across threads, one write per span."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def export(self, span: Span) -> None:
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock, open(self.path, "a", encoding="utf-8") as fh:
+            fh.write(line)
+
+
+def _build_exporter(name: str):
+    if not name:
+        return None
+    if name == "log":
+        return LogExporter()
+    if name == "jsonl":
+        return JsonlExporter(settings.TRACING_JSONL_PATH)
+    module, _, attr = name.partition(":")
+    return getattr(importlib.import_module(module), attr)()
+
+
+_exporter = _build_exporter(settings.TRACING_EXPORTER)
+_current: ContextVar[SpanContext | None] = ContextVar("trace_context", default=None)
+
+
+def enabled() -> bool:
+    return _exporter is not None
+
+
+def set_exporter(exporter) -> None:
+    global _exporter
+    _exporter = exporter
+
+
+def parse_traceparent(value: str | None) -> SpanContext | None:
+    parts = (value or "").strip().split("-")
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    try:
+        int(parts[1], 16), int(parts[2], 16)
+        flags = int(parts[3], 16)
+    except ValueError:
+        return None
+    return SpanContext(parts[1], parts[2], bool(flags & 1))
+
+
+def current_traceparent() -> str | None:
+    ctx = _current.get()
+    return ctx.traceparent if ctx is not None and enabled() else None
+
+
+def attach(traceparent: str | None) -> Token | None:
+    """Make a remote parent (e.g. from a task header) current; pass the token to ``detach``."""
+    ctx = parse_traceparent(traceparent)
+    return _current.set(ctx) if ctx is not None else None
+
+
+def detach(token: Token | None) -> None:
+    if token is not None:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, parent: str | None = None, **attributes: Any) -> Iterator[Span | None]:
+    """Run the enclosed block as a span, child of ``parent`` or of the current context."""
+    if _exporter is None:
+        yield None
+        return
+
+    parent_ctx = parse_traceparent(parent) if parent else _current.get()
+    if parent_ctx is None:
+        trace_id = os.urandom(16).hex()
+        sampled = random.random() < settings.TRACING_SAMPLE_RATE
+    else:
+        trace_id, sampled = parent_ctx.trace_id, parent_ctx.sampled
+    s = Span(
+        name=name,
+        trace_id=trace_id,
+        span_id=os.urandom(8).hex(),
+        parent_id=parent_ctx.span_id if parent_ctx else None,
+        sampled=sampled,
+        attributes=attributes,
+    )
+    token = _current.set(s.context)
+    try:
+        yield s
+    except BaseException as exc:
+        s.status = "error"
+        s.error = f"{type(exc).__name__}: {exc}"
+        raise
+    finally:
+        s.end = time.time()
+        _current.reset(token)
+        if s.sampled:
+            try:
+                _exporter.export(s)
+            except Exception as e:
+                logger.debug("Span export failed: %s", e)
@@ -1,4 +1,4 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import declarative_base, scoped_session, sessionmaker
 
 from ..core.config import settings
@@ -17,3 +17,11 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def table_columns(bind, table: str) -> set[str]:
+    """Column names of ``table``; empty if it does not exist. Used by migrations."""
+    inspector = inspect(bind)
+    if not inspector.has_table(table):
+        return set()
+    return {c["name"] for c in inspector.get_columns(table)}
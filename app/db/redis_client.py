@@ -3,3 +3,6 @@
 from ..core.config import settings
 
 redis_client = redis.Redis.from_url(settings.REDIS_URL, decode_responses=True)
+
+# Raw bytes client for binary payloads (bytecode, serialized frames).
+redis_bytes_client = redis.Redis.from_url(settings.REDIS_URL)
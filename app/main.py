@@ -1,7 +1,9 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.staticfiles import StaticFiles
 
 from .api import admin, auth, reports
+from .celery_app import queue_depth_collector
+from .core import metrics
 from .core.config import settings
 from .core.logging import configure_logging
 from .core.openapi import apply_custom_openapi
@@ -27,3 +29,14 @@
 @app.get("/")
 def health():
     return {"status": "ok"}
+
+
+if settings.METRICS_ENABLED:
+    collector = queue_depth_collector()
+    if collector is not None:
+        metrics.register_collector(collector)
+
+    @app.get("/metrics", include_in_schema=False)
+    def prometheus_metrics():
+        data, content_type = metrics.render()
+        return Response(content=data, media_type=content_type)
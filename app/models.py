@@ -2,7 +2,20 @@
 from datetime import UTC, datetime
 from enum import Enum
 
-from sqlalchemy import Boolean, Column, DateTime, Enum as SAEnum, ForeignKey, String, Text
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    DateTime,
+    Enum as SAEnum,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    SmallInteger,
+    String,
+    Text,
+)
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import relationship
 
@@ -33,6 +46,9 @@ class Report(Base):
     template_id = Column(String(100), nullable=False, index=True)
     input_args = Column(JSONB, nullable=False, default=dict)
     status = Column(SAEnum(ReportStatus), nullable=False, default=ReportStatus.PENDING)
+    priority = Column(SmallInteger, nullable=False, default=5, server_default="5")
+    deadline = Column(DateTime(timezone=True), nullable=True)
+    batch_id = Column(UUID(as_uuid=True), nullable=True, index=True)
     output_content = Column(Text, default="")
     output_file = Column(String(200), default="")
     updated_at = Column(
@@ -43,3 +59,53 @@ class Report(Base):
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(UTC))
 
     user = relationship("User")
+
+
+class ReportTiming(Base):
+    """One run of one pipeline stage for a report."""
+
+    __tablename__ = "report_timings"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    report_id = Column(
+        UUID(as_uuid=True), ForeignKey("reports.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    template_id = Column(String(100), nullable=False)
+    stage = Column(String(50), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    finished_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    queue_wait_ms = Column(Float, nullable=True)
+    payload_bytes = Column(Integer, nullable=True)
+    ok = Column(Boolean, nullable=False, default=True)
+
+    __table_args__ = (
+        Index("ix_report_timings_template_stage", "template_id", "stage", "started_at"),
+    )
+
+
+class ReportQuery(Base):
+    """One data-source query run while generating a report."""
+
+    __tablename__ = "report_queries"
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    report_id = Column(
+        UUID(as_uuid=True), ForeignKey("reports.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    template_id = Column(String(100), nullable=False)
+    stage = Column(String(50), nullable=False)
+    fingerprint = Column(String(16), nullable=False)
+    statement = Column(Text, nullable=False)
+    params_hash = Column(String(16), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False)
+    duration_ms = Column(Float, nullable=False)
+    rows = Column(Integer, nullable=True)
+    bytes = Column(BigInteger, nullable=True)
+    retries = Column(SmallInteger, nullable=False, default=0)
+    cached = Column(Boolean, nullable=False, default=False)
+    ok = Column(Boolean, nullable=False, default=True)
+    # Reports served by this one query; a batched fetch writes a row for each of them, all
+    # with the same ``execution_id``.
+    reports = Column(SmallInteger, nullable=False, default=1)
+    execution_id = Column(UUID(as_uuid=True), nullable=False)
+
+    __table_args__ = (Index("ix_report_queries_started_template", "started_at", "template_id"),)
@@ -1,7 +1,10 @@
+from datetime import UTC, datetime
 from typing import Any
 from uuid import UUID
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
+
+from .core.config import settings
 
 
 class Token(BaseModel):
@@ -20,6 +23,21 @@ class LoginRequest(BaseModel):
 class ReportCreate(BaseModel):
     template_id: str
     input_args: dict[str, Any] = Field(default_factory=dict)
+    priority: int | None = Field(
+        None, ge=0, le=9, description="0 (background) to 9 (most urgent); higher runs first"
+    )
+    deadline: datetime | None = Field(
+        None, description="Drop (or deprioritise) the report if not generated by this time"
+    )
+
+    @field_validator("deadline")
+    @classmethod
+    def _deadline_utc(cls, v: datetime | None) -> datetime | None:
+        # Naive timestamps are taken as UTC so workers can compare them safely.
+        if v is not None and v.tzinfo is None:
+            v = v.replace(tzinfo=UTC)
+        return v
+
     model_config = ConfigDict(
         json_schema_extra={
             "examples": [
@@ -36,3 +54,17 @@ class ReportOut(BaseModel):
     hash_id: UUID
     status: str
     pdf_url: str | None = None
+
+
+class ReportBatchCreate(BaseModel):
+    items: list[ReportCreate] = Field(min_length=1, max_length=settings.REPORT_BATCH_MAX_ITEMS)
+
+
+class ReportBatchOut(BaseModel):
+    batch_id: UUID
+    reports: list[ReportOut]
+
+
+class ReportBatchStatusOut(ReportBatchOut):
+    total: int
+    counts: dict[str, int] = Field(default_factory=dict)
@@ -1,20 +1,24 @@
 from __future__ import annotations
 
 import logging
+import time
 from datetime import UTC, datetime
 from typing import Any
 
-from jinja2 import BaseLoader, Environment
-
+from ..core import metrics, tracing
 from ..core.config import settings
+from .concurrency import fetch_slots
 from .db.db_adapter import DBAdapter
-from .db.mssql import MSSQLClient
+from .db.sources import data_sources
 from .exceptions import (
     LogicExecutionError,
     NoDataFoundError,
     TemplateNotFoundError,
+    TemporarilyUnavailableError,
     TestExecutionError,
 )
+from .jinja_env import template_cache
+from .placeholder_cache import placeholder_cache
 from .request import session
 from .runtime import exec_module, require_callable
 from .templates_repo import registry
@@ -39,16 +43,10 @@ def _ensure_assets(template_id: str) -> dict:
     return assets
 
 
-def fetch_placeholders(template_id: str, process_args: dict[str, Any]) -> dict[str, Any]:
-    assets = _ensure_assets(template_id)
-    test_src = assets["test"]
-    logic_src = assets["logic"]
+def _run_test(ns_test, process_args: dict[str, Any], db_wrapper: DBAdapter) -> None:
     try:
-        ns_test = exec_module(test_src)
         if hasattr(ns_test, "main"):
-            with MSSQLClient() as db:
-                db_wrapper = DBAdapter(db)
-                ok = require_callable(ns_test, "main")(process_args, db_wrapper)
+            ok = require_callable(ns_test, "main")(process_args, db_wrapper)
             if not bool(ok):
                 raise NoDataFoundError(
                     "No data found or preconditions failed (test.main returned False)."
@@ -56,21 +54,209 @@ def fetch_placeholders(template_id: str, process_args: dict[str, Any]) -> dict[s
 
     except AttributeError:
         pass
+    except TemporarilyUnavailableError:
+        raise
     except Exception as err:
         raise TestExecutionError(str(err)) from err
 
+
+def _run_logic(ns, process_args: dict[str, Any], db_wrapper: DBAdapter) -> dict[str, Any]:
     try:
-        ns = exec_module(logic_src)
-        with MSSQLClient() as db:
-            db_wrapper = DBAdapter(db)
-            placeholders = require_callable(ns, "main")(process_args, db_wrapper)
+        placeholders = require_callable(ns, "main")(process_args, db_wrapper)
         if not isinstance(placeholders, dict):
             raise LogicExecutionError("logic.main() must return a dict of placeholders")
         return placeholders
+    except TemporarilyUnavailableError:
+        raise
     except Exception as err:
         raise LogicExecutionError(str(err)) from err
 
 
+def _load_scripts(template_id: str, assets: dict):
+    etag = assets.get("etag", "")
+    try:
+        ns_test = exec_module(assets["test"], template_id, "test", etag)
+    except Exception as err:
+        raise TestExecutionError(str(err)) from err
+    try:
+        ns = exec_module(assets["logic"], template_id, "logic", etag)
+    except Exception as err:
+        raise LogicExecutionError(str(err)) from err
+    return ns_test, ns
+
+
+def run_scripts(template_id: str, process_args: dict[str, Any], db_wrapper) -> dict[str, Any]:
+    """Run a template's test.py and logic.py on ``db_wrapper``, bypassing the placeholder cache.
+
+    Used to record and replay data fixtures (see ``services/db/fixtures.py``); the pipeline
+    goes through ``fetch_placeholders``.
+    """
+    ns_test, ns = _load_scripts(template_id, _ensure_assets(template_id))
+    _run_test(ns_test, process_args, db_wrapper)
+    return _run_logic(ns, process_args, db_wrapper)
+
+
+def fetch_placeholders(
+    template_id: str, process_args: dict[str, Any], use_cache: bool = True
+) -> dict[str, Any]:
+    """Run test.py and logic.py for one argument set.
+
+    ``use_cache=False`` skips the placeholder and query caches, e.g. so a profiled run
+    measures the real data fetch.
+    """
+    assets = _ensure_assets(template_id)
+    etag = assets.get("etag", "")
+    cache_ttl = placeholder_cache.ttl_for(assets.get("meta")) if use_cache else 0
+    if cache_ttl:
+        cached = placeholder_cache.get(template_id, etag, process_args)
+        if cached is not None:
+            logger.debug("Placeholder cache hit for template %s", template_id)
+            return cached
+
+    ns_test, ns = _load_scripts(template_id, assets)
+
+    # One pooled connection serves both the test and the logic phase.
+    source = data_sources.source_for(assets.get("meta"))
+    pool = data_sources.pool(source)
+    with fetch_slots(template_id, assets.get("meta"), source), pool.connection() as db:
+        db_wrapper = DBAdapter(db, pool=pool, use_cache=use_cache)
+        _run_test(ns_test, process_args, db_wrapper)
+        placeholders = _run_logic(ns, process_args, db_wrapper)
+
+    if cache_ttl:
+        placeholder_cache.set(template_id, etag, process_args, placeholders, cache_ttl)
+    return placeholders
+
+
+def _run_test_batch(
+    ns_test, args_list: list[dict[str, Any]], pending: list[int], results: list, db_wrapper
+) -> list[int]:
+    """Run the test phase for ``pending`` items; returns the indices that passed."""
+    if hasattr(ns_test, "main_batch"):
+        try:
+            oks = require_callable(ns_test, "main_batch")(
+                [args_list[i] for i in pending], db_wrapper
+            )
+            if not isinstance(oks, list | tuple) or len(oks) != len(pending):
+                raise TestExecutionError(
+                    "test.main_batch() must return one result per argument set"
+                )
+        except TemporarilyUnavailableError:
+            raise
+        except Exception as err:
+            if not hasattr(ns_test, "main"):
+                for i in pending:
+                    results[i] = TestExecutionError(str(err))
+                return []
+            logger.warning("test.main_batch failed (%s); falling back to test.main", err)
+        else:
+            passed = []
+            for i, ok in zip(pending, oks, strict=True):
+                if ok:
+                    passed.append(i)
+                else:
+                    results[i] = NoDataFoundError(
+                        "No data found or preconditions failed (test.main_batch returned False)."
+                    )
+            return passed
+
+    passed = []
+    for i in pending:
+        try:
+            _run_test(ns_test, args_list[i], db_wrapper)
+        except TemporarilyUnavailableError:
+            raise
+        except Exception as err:
+            results[i] = err
+            continue
+        passed.append(i)
+    return passed
+
+
+def _run_logic_batch(
+    ns, args_list: list[dict[str, Any]], pending: list[int], results: list, db_wrapper
+) -> None:
+    if hasattr(ns, "main_batch"):
+        try:
+            out = require_callable(ns, "main_batch")([args_list[i] for i in pending], db_wrapper)
+            if not isinstance(out, list | tuple) or len(out) != len(pending):
+                raise LogicExecutionError(
+                    "logic.main_batch() must return one placeholders dict per argument set"
+                )
+            if not all(isinstance(p, dict) for p in out):
+                raise LogicExecutionError("logic.main_batch() must return dicts of placeholders")
+        except TemporarilyUnavailableError:
+            raise
+        except Exception as err:
+            if not hasattr(ns, "main"):
+                for i in pending:
+                    results[i] = LogicExecutionError(str(err))
+                return
+            logger.warning("logic.main_batch failed (%s); falling back to logic.main", err)
+        else:
+            for i, placeholders in zip(pending, out, strict=True):
+                results[i] = placeholders
+            return
+
+    for i in pending:
+        try:
+            results[i] = _run_logic(ns, args_list[i], db_wrapper)
+        except TemporarilyUnavailableError:
+            raise
+        except Exception as err:
+            results[i] = err
+
+
+def fetch_placeholders_batch(
+    template_id: str, args_list: list[dict[str, Any]], use_cache: bool = True
+) -> list[dict[str, Any] | Exception]:
+    """Fetch placeholders for many argument sets of one template on a single connection.
+
+    Templates may define ``main_batch(list_of_process_args, db)`` in ``logic.py`` (and
+    optionally ``test.py``) returning one result per argument set, in order, so the data can
+    be read with a few set-based queries. Without it, ``main`` runs once per argument set.
+    Each result is either a placeholders dict or the exception raised for that argument set.
+    ``use_cache`` is as for ``fetch_placeholders``.
+    """
+    assets = _ensure_assets(template_id)
+    etag = assets.get("etag", "")
+    cache_ttl = placeholder_cache.ttl_for(assets.get("meta")) if use_cache else 0
+
+    results: list[dict[str, Any] | Exception | None] = [None] * len(args_list)
+    pending = []
+    for i, process_args in enumerate(args_list):
+        cached = placeholder_cache.get(template_id, etag, process_args) if cache_ttl else None
+        if cached is not None:
+            results[i] = cached
+        else:
+            pending.append(i)
+    if not pending:
+        return results
+
+    ns_test, ns = _load_scripts(template_id, assets)
+
+    source = data_sources.source_for(assets.get("meta"))
+    pool = data_sources.pool(source)
+    with fetch_slots(template_id, assets.get("meta"), source), pool.connection() as db:
+        db_wrapper = DBAdapter(db, pool=pool, use_cache=use_cache)
+        pending = _run_test_batch(ns_test, args_list, pending, results, db_wrapper)
+        if not pending:
+            return results
+        _run_logic_batch(ns, args_list, pending, results, db_wrapper)
+
+    if cache_ttl:
+        for i in pending:
+            if isinstance(results[i], dict):
+                placeholder_cache.set(template_id, etag, args_list[i], results[i], cache_ttl)
+    logger.debug(
+        "Fetched placeholders for %s/%s argument sets of %s",
+        len(pending),
+        len(args_list),
+        template_id,
+    )
+    return results
+
+
 def render_html(template_id: str, placeholders: dict[str, Any]) -> tuple[str, dict[str, Any]]:
     assets = _ensure_assets(template_id)
     html_tpl = assets["html"]
@@ -84,8 +270,7 @@ def render_html(template_id: str, placeholders: dict[str, Any]) -> tuple[str, di
         "footer": pdf_opts.get("footer", None),
     }
 
-    env = Environment(loader=BaseLoader(), autoescape=False)
-    tmpl = env.from_string(html_tpl)
+    tmpl = template_cache.get(template_id, assets.get("etag", ""), html_tpl)
     ctx = dict(placeholders)
     ctx.setdefault("generated_at", datetime.now(UTC).isoformat())
     rendered = tmpl.render(**ctx)
@@ -116,7 +301,12 @@ def construct_payload(output_path: str, html: str, pdf_kwargs: dict) -> dict:
 
 def render_pdf(output_path, html, pdf_kwargs):
     payload = construct_payload(output_path, html, pdf_kwargs)
-    r = session.post(f"http://{settings.GENERATOR_HOST}/generate-pdf", data=payload)
+    started = time.perf_counter()
+    with tracing.span("generator.render_pdf", output=output_path, html_bytes=len(html)) as span:
+        r = session.post(f"http://{settings.GENERATOR_HOST}/generate-pdf", data=payload)
+        if span is not None:
+            span.set_attribute("http.status_code", r.status_code)
+    metrics.generator_duration.labels(str(r.status_code)).observe(time.perf_counter() - started)
     if r.status_code == 200:
         logger.info(f"{output_path} generated successfully")
         logger.debug(f"{r.json()}")
@@ -0,0 +1,142 @@
+"""Request coalescing and idempotency keys for report submissions.
+
+Identical submissions ``(template_id, normalized process_args, template etag)`` attach to the
+pipeline already in flight, or to its result while it is younger than
+``REPORT_COALESCE_WINDOW_SECONDS``, unless that run is less urgent than the new request. An
+``Idempotency-Key`` maps client retries to the report created by the first attempt.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+from datetime import datetime
+from typing import Any
+
+from ..core.config import settings
+from ..db.redis_client import redis_client
+from .placeholder_cache import args_digest
+from .templates_repo import registry
+
+logger = logging.getLogger(__name__)
+
+
+def _fp_key(fingerprint: str) -> str:
+    return f"reports:coalesce:{fingerprint}"
+
+
+def _report_key(report_id: str) -> str:
+    return f"reports:coalesce:report:{report_id}"
+
+
+def _idem_key(user_id: Any, key: str) -> str:
+    digest = hashlib.sha256(key.encode("utf-8")).hexdigest()
+    return f"reports:idem:{user_id}:{digest}"
+
+
+def fingerprint(template_id: str, process_args: dict[str, Any]) -> str:
+    etag = registry.get_template_etag(template_id) or ""
+    raw = f"{template_id}\x00{etag}\x00{args_digest(process_args)}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _attachable(current: list[str], priority: int, deadline: datetime | None) -> bool:
+    # Entries written before priority and deadline were recorded carry neither.
+    if len(current) < 4:
+        return True
+    if priority > int(current[2]):
+        return False
+    run_deadline = datetime.fromisoformat(current[3]) if current[3] else None
+    if run_deadline is None or deadline == run_deadline:
+        return True
+    if deadline is None or deadline > run_deadline:
+        # The run could be dropped at its own deadline, before this request's.
+        return settings.REPORT_DEADLINE_POLICY != "drop"
+    return False
+
+
+def claim(
+    fp: str,
+    report_id: str,
+    hash_id: str,
+    priority: int,
+    deadline: datetime | None = None,
+) -> str | None:
+    """Register a new run for ``fp``; returns the hash_id of a matching run if one exists.
+
+    A matching run that is less urgent than this request (lower priority or later deadline)
+    is not shared: the new run takes over ``fp`` and ``None`` is returned.
+    """
+    value = f"{report_id}|{hash_id}|{priority}|{deadline.isoformat() if deadline else ''}"
+    ttl = settings.REPORT_COALESCE_INFLIGHT_TTL
+    try:
+        if not redis_client.set(_fp_key(fp), value, nx=True, ex=ttl):
+            current = redis_client.get(_fp_key(fp))
+            if current:
+                parts = current.split("|")
+                if _attachable(parts, priority, deadline):
+                    return parts[1]
+            redis_client.set(_fp_key(fp), value, ex=ttl)
+        redis_client.set(_report_key(report_id), fp, ex=ttl)
+    except Exception as e:
+        logger.warning("Report coalescing unavailable: %s", e)
+    return None
+
+
+def finish(report_id: str, ok: bool) -> None:
+    """Keep a finished run attachable for the freshness window; forget failed runs."""
+    try:
+        fp = redis_client.get(_report_key(report_id))
+        if not fp:
+            return
+        redis_client.delete(_report_key(report_id))
+        current = redis_client.get(_fp_key(fp)) or ""
+        if not current.startswith(f"{report_id}|"):
+            return
+        if ok and settings.REPORT_COALESCE_WINDOW_SECONDS > 0:
+            redis_client.expire(_fp_key(fp), settings.REPORT_COALESCE_WINDOW_SECONDS)
+        else:
+            redis_client.delete(_fp_key(fp))
+    except Exception as e:
+        logger.warning("Failed to update coalescing state for report %s: %s", report_id, e)
+
+
+def request_fingerprint(
+    template_id: str,
+    input_args: dict[str, Any],
+    priority: int | None = None,
+    deadline: datetime | None = None,
+) -> str:
+    """Digest of a submission as sent, to tell a retry from a reused ``Idempotency-Key``."""
+    raw = "\x00".join(
+        (
+            template_id,
+            args_digest(input_args),
+            "" if priority is None else str(priority),
+            deadline.isoformat() if deadline else "",
+        )
+    )
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def lookup_idempotent(user_id: Any, key: str) -> tuple[str, str | None] | None:
+    """Return ``(hash_id, request fingerprint)`` stored for ``key``, if any."""
+    try:
+        value = redis_client.get(_idem_key(user_id, key))
+    except Exception as e:
+        logger.warning("Idempotency lookup failed: %s", e)
+        return None
+    if not value:
+        return None
+    # Keys stored before fingerprints were recorded hold the bare hash_id.
+    hash_id, _, fp = value.partition("|")
+    return hash_id, fp or None
+
+
+def remember_idempotent(user_id: Any, key: str, hash_id: str, request_fp: str) -> None:
+    try:
+        redis_client.set(
+            _idem_key(user_id, key), f"{hash_id}|{request_fp}", ex=settings.IDEMPOTENCY_KEY_TTL
+        )
+    except Exception as e:
+        logger.warning("Failed to store idempotency key: %s", e)
@@ -0,0 +1,97 @@
+"""Redis-backed concurrency limits for placeholder fetches."""
+
+from __future__ import annotations
+
+import logging
+import random
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import ExitStack, contextmanager
+
+from ..core.config import settings
+from ..db.redis_client import redis_client
+from .db.sources import data_sources
+from .exceptions import ConcurrencyLimitError
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1] = slots; ARGV = now, lease seconds, limit, token
+_ACQUIRE = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], tonumber(ARGV[1]) + tonumber(ARGV[2]), ARGV[4])
+    redis.call('EXPIRE', KEYS[1], math.ceil(tonumber(ARGV[2])))
+    return 1
+end
+return 0
+"""
+
+
+class RedisSemaphore:
+    """Counting semaphore shared by all workers through Redis.
+
+    Args:
+        name: Logical name; slots live under ``semaphore:{name}``.
+        limit: Maximum concurrent holders.
+        lease: Seconds after which an unreleased slot expires.
+    """
+
+    def __init__(self, name: str, limit: int, lease: int | None = None):
+        self.r = redis_client
+        self.name = name
+        self.limit = limit
+        self.lease = lease or settings.CONCURRENCY_LEASE_SECONDS
+        self.key = f"semaphore:{name}"
+        self._acquire = self.r.register_script(_ACQUIRE)
+
+    def acquire(self) -> str | None:
+        """Take a slot; returns its token, or ``None`` when all slots are in use."""
+        token = uuid.uuid4().hex
+        try:
+            ok = self._acquire(keys=[self.key], args=[time.time(), self.lease, self.limit, token])
+        except Exception as e:
+            logger.warning("Semaphore %s unavailable; not limiting: %s", self.name, e)
+            return token
+        return token if ok else None
+
+    def release(self, token: str) -> None:
+        try:
+            self.r.zrem(self.key, token)
+        except Exception as e:
+            logger.debug("Semaphore %s release failed: %s", self.name, e)
+
+    def count(self) -> int:
+        return self.r.zcount(self.key, time.time(), "+inf")
+
+    @contextmanager
+    def hold(self) -> Iterator[None]:
+        token = self.acquire()
+        if token is None:
+            countdown = settings.CONCURRENCY_RETRY_COUNTDOWN
+            raise ConcurrencyLimitError(
+                f"Concurrency limit {self.limit} reached for {self.name}",
+                retry_after=countdown * (1 + random.random()),
+            )
+        try:
+            yield
+        finally:
+            self.release(token)
+
+
+def template_limit(meta: dict | None) -> int:
+    limits = (meta or {}).get("limits") if isinstance(meta, dict) else None
+    return int((limits or {}).get("concurrency", settings.TEMPLATE_CONCURRENCY_LIMIT) or 0)
+
+
+@contextmanager
+def fetch_slots(template_id: str, meta: dict | None, source: str) -> Iterator[None]:
+    """Hold a template slot and a data-source slot for the duration of one fetch."""
+    with ExitStack() as stack:
+        limit = template_limit(meta)
+        if limit > 0:
+            stack.enter_context(RedisSemaphore(f"template:{template_id}", limit).hold())
+        limit = data_sources.concurrency_limit(source)
+        if limit > 0:
+            stack.enter_context(RedisSemaphore(f"source:{source}", limit).hold())
+        yield
@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+import pyarrow as pa
+
+from . import cursors
+
+logger = logging.getLogger(__name__)
+
+
+class DBClient:
+    """Common DB-API client used by ``DBAdapter`` and ``ConnectionPool``.
+
+    Subclasses implement ``_connect`` and may override ``stream_cursor`` to read large results
+    through a server-side cursor.
+    """
+
+    kind = "db"
+
+    def __init__(self, dsn: str | None = None, autocommit: bool = False, timeout: int = 30):
+        self.dsn = dsn
+        self.autocommit = autocommit
+        self.timeout = timeout
+        self.conn: Any = None
+
+    def _connect(self) -> Any:
+        raise NotImplementedError
+
+    def connect(self):
+        if not self.dsn:
+            raise RuntimeError(f"DSN for {self.kind} data source is not configured.")
+        self.conn = self._connect()
+
+    def close(self):
+        if self.conn:
+            try:
+                self.conn.close()
+            finally:
+                self.conn = None
+
+    def ping(self) -> bool:
+        if not self.conn:
+            return False
+        try:
+            cur = self.conn.cursor()
+            cur.execute("SELECT 1")
+            cur.fetchone()
+            cur.close()
+            return True
+        except Exception:
+            return False
+
+    def reset(self, commit: bool = False):
+        if self.conn and not self.autocommit:
+            if commit:
+                self.conn.commit()
+            else:
+                self.conn.rollback()
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.reset(commit=exc is None)
+        self.close()
+
+    def _ensure_conn(self):
+        if not self.conn:
+            self.connect()
+        return self.conn
+
+    def stream_cursor(self):
+        return self._ensure_conn().cursor()
+
+    def fetch_all(self, sql: str, params: Iterable[Any] | None = None) -> list[dict]:
+        cur = self._ensure_conn().cursor()
+        cursors.execute(cur, sql, params)
+        cols = [c[0] for c in cur.description] if cur.description else []
+        return [dict(zip(cols, row, strict=False)) for row in cur.fetchall()]
+
+    def iter_batches(
+        self, sql: str, params: Iterable[Any] | None = None, batch_size: int | None = None
+    ) -> Iterator[list[dict]]:
+        for cols, rows in cursors.iter_batches(self.stream_cursor, sql, params, batch_size):
+            yield [dict(zip(cols, row, strict=False)) for row in rows]
+
+    def fetch_arrow(
+        self, sql: str, params: Iterable[Any] | None = None, batch_size: int | None = None
+    ) -> pa.Table:
+        return cursors.fetch_arrow(self.stream_cursor, sql, params, batch_size)
+
+    def fetch_one(self, sql: str, params: Iterable[Any] | None = None) -> dict | None:
+        rows = self.fetch_all(sql, params)
+        return rows[0] if rows else None
+
+    def execute(self, sql: str, params: Iterable[Any] | None = None) -> int:
+        cur = self._ensure_conn().cursor()
+        cursors.execute(cur, sql, params)
+        return cur.rowcount
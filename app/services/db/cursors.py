@@ -0,0 +1,95 @@
+"""Batch-oriented helpers over DB-API cursors.
+
+Rows are pulled with ``fetchmany`` and transposed per batch, so no per-row dicts are built and
+memory stays bounded by ``batch_size`` while iterating. Every helper takes a zero-argument
+``make_cursor`` so clients can hand out server-side cursors (e.g. named Postgres cursors).
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable, Iterator, Sequence
+from contextlib import contextmanager
+from typing import Any
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from ...core.config import settings
+
+Rows = Sequence[Sequence[Any]]
+
+
+def execute(cur, sql: str, params: Any = None) -> None:
+    if params:
+        cur.execute(sql, params)
+    else:
+        cur.execute(sql)
+
+
+@contextmanager
+def _batches(
+    make_cursor: Callable[[], Any], sql: str, params: Any, batch_size: int | None
+) -> Iterator[tuple[list[str], Iterator[Rows]]]:
+    batch_size = batch_size or settings.DB_FETCH_BATCH_SIZE
+    cur = make_cursor()
+    try:
+        cur.arraysize = batch_size
+        execute(cur, sql, params)
+        first = cur.fetchmany(batch_size)
+        # Server-side cursors only describe their columns after the first fetch.
+        cols = [c[0] for c in cur.description] if cur.description else []
+
+        def _rows() -> Iterator[Rows]:
+            rows = first
+            while rows:
+                yield rows
+                rows = cur.fetchmany(batch_size)
+
+        yield cols, _rows()
+    finally:
+        cur.close()
+
+
+def iter_batches(
+    make_cursor: Callable[[], Any], sql: str, params: Any = None, batch_size: int | None = None
+) -> Iterator[tuple[list[str], Rows]]:
+    """Yield ``(columns, rows)`` with at most ``batch_size`` rows per batch."""
+    with _batches(make_cursor, sql, params, batch_size) as (cols, batches):
+        for rows in batches:
+            yield cols, rows
+
+
+def _transpose(cols: list[str], rows: Rows) -> dict[str, list[Any]]:
+    return dict(zip(cols, (list(c) for c in zip(*rows, strict=True)), strict=True))
+
+
+def iter_frames(
+    make_cursor: Callable[[], Any], sql: str, params: Any = None, batch_size: int | None = None
+) -> Iterator[pd.DataFrame]:
+    for cols, rows in iter_batches(make_cursor, sql, params, batch_size):
+        yield pd.DataFrame(_transpose(cols, rows), columns=cols)
+
+
+def fetch_arrow(
+    make_cursor: Callable[[], Any], sql: str, params: Any = None, batch_size: int | None = None
+) -> pa.Table:
+    with _batches(make_cursor, sql, params, batch_size) as (cols, batches):
+        tables = [pa.table(_transpose(cols, rows)) for rows in batches]
+    if not tables:
+        return pa.table({c: pa.array([], type=pa.null()) for c in cols})
+    # Batches infer types independently (e.g. an all-NULL batch), so let Arrow promote.
+    return pa.concat_tables(tables, promote_options="default")
+
+
+def fetch_columns(
+    make_cursor: Callable[[], Any], sql: str, params: Any = None, batch_size: int | None = None
+) -> dict[str, np.ndarray]:
+    return table_columns(fetch_arrow(make_cursor, sql, params, batch_size))
+
+
+def table_columns(table: pa.Table) -> dict[str, np.ndarray]:
+    return {
+        name: col.to_numpy(zero_copy_only=False)
+        for name, col in zip(table.column_names, table.columns, strict=True)
+    }
@@ -1,29 +1,234 @@
+import contextvars
 import logging
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 import pandas as pd
 
+from ...core import metrics, tracing
+from ...core.config import settings
+from .. import query_log
+from ..exceptions import TemporarilyUnavailableError
+from . import cursors
+from .query_cache import query_cache
+from .resilience import breaker_for, call_with_retries, dsn_namespace, is_connection_error
+
 logger = logging.getLogger(__name__)
 
 
+def _statement(query: str | None, limit: int = 500) -> str | None:
+    if not query:
+        return None
+    query = " ".join(str(query).split())
+    return query if len(query) <= limit else query[:limit] + "..."
+
+
+class QueryBatch(dict):
+    """Result of ``DBAdapter.read_many``: ``{name: DataFrame | None}`` plus errors and timings."""
+
+    def __init__(self):
+        super().__init__()
+        self.errors: dict[str, Exception] = {}
+        self.timings: dict[str, float] = {}
+
+
+class QueryBatchError(RuntimeError):
+    def __init__(self, batch: QueryBatch):
+        self.batch = batch
+        failed = ", ".join(f"{k}: {v}" for k, v in batch.errors.items())
+        super().__init__(f"{len(batch.errors)} of {len(batch)} queries failed ({failed})")
+
+
 class DBAdapter:
-    def __init__(self, db):
+    def __init__(self, db, pool=None, use_cache=True):
         self.db = db
+        self.pool = pool
+        # False ignores ``cache_ttl`` so every read hits the database (profiled runs).
+        self.use_cache = use_cache
+        self.source_id = dsn_namespace(getattr(db, "dsn", ""))
+        self.breaker = breaker_for(f"db:{self.source_id}")
+        # Data-source name for metrics and spans; falls back to the DSN namespace.
+        self._source = pool.name if pool is not None else self.source_id
+
+    def _reconnect(self, exc: Exception) -> None:
+        # Retrying on a connection the server already dropped cannot succeed.
+        if is_connection_error(exc) and hasattr(self.db, "connect"):
+            logger.info("Reconnecting after connection error: %s", exc)
+            self.db.close()
+            self.db.connect()
+
+    def _on_retry(self, exc: Exception) -> None:
+        query_log.retried()
+        self._reconnect(exc)
+
+    def _call(self, fn, statement: str | None = None):
+        started = time.perf_counter()
+        try:
+            with tracing.span("db.query", source=self._source, statement=_statement(statement)):
+                return call_with_retries(fn, self.breaker, on_retry=self._on_retry)
+        except TemporarilyUnavailableError:
+            raise
+        except Exception as e:
+            logger.error(f"Error executing query: {e}", exc_info=True)
+            raise
+        finally:
+            metrics.db_query_duration.labels(self._source).observe(time.perf_counter() - started)
+
+    def _read_sql(self, query, params=None):
+        return self._call(
+            lambda: pd.read_sql_query(query, self.db.conn, params=params), statement=query
+        )
+
+    def read_sql(self, query, params=None, none_on_empty_df=False, cache_ttl=None):
+        """Run ``query`` and return a DataFrame.
+
+        Pass ``cache_ttl`` (seconds) to share the result across reports and workers; concurrent
+        misses on the same SQL and params run the query only once.
+        """
+        with query_log.query(query, params) as entry:
+            if cache_ttl and self.use_cache:
+
+                def load():
+                    if entry is not None:
+                        entry["cached"] = False
+                    return self._read_sql(query, params)
 
-    def read_sql(self, query, params=None, none_on_empty_df=False):
-        for _ in range(3):
+                if entry is not None:
+                    entry["cached"] = True
+                key = query_cache.key(query, params, namespace=self.source_id)
+                df = query_cache.get_or_load(key, int(cache_ttl), load)
+            else:
+                df = self._read_sql(query, params)
+            if entry is not None:
+                entry["rows"] = len(df)
+                entry["bytes"] = query_log.frame_bytes(df)
+        if df.empty and none_on_empty_df:
+            return None
+        return df
+
+    def _for_connection(self, client) -> "DBAdapter":
+        """Adapter for another pooled connection, e.g. one ``read_many`` thread's."""
+        return DBAdapter(client, pool=self.pool, use_cache=self.use_cache)
+
+    def _timed_read(self, name, query, params, cache_ttl):
+        started = time.perf_counter()
+        try:
+            df = self.read_sql(query, params, cache_ttl=cache_ttl)
+            return df, None, time.perf_counter() - started
+        except Exception as e:
+            logger.error("Query %r in read_many failed: %s", name, e)
+            return None, e, time.perf_counter() - started
+
+    def _drain(self, todo: deque, specs: dict, out: dict) -> bool:
+        """Run queries from ``todo`` on this adapter's connection; False if any failed."""
+        ok = True
+        while True:
+            try:
+                name = todo.popleft()
+            except IndexError:
+                return ok
+            out[name] = self._timed_read(name, *specs[name])
+            ok = ok and out[name][1] is None
+
+    def _spare_connections(self, n: int) -> list:
+        """Up to ``n`` pooled clients that are free right now, without waiting for any."""
+        clients = []
+        while self.pool is not None and len(clients) < n:
             try:
-                df = pd.read_sql_query(query, self.db.conn, params=params)
-                if df.empty and none_on_empty_df:
-                    return None
-                return df
+                client = self.pool.acquire(block=False)
             except Exception as e:
-                logger.error(f"Error executing query: {e}", exc_info=True)
-                time.sleep(0.5)
-        raise RuntimeError("Failed to execute query after 3 attempts.")
+                logger.debug("No spare %s connection for read_many: %s", self._source, e)
+                break
+            if client is None:
+                break
+            clients.append(client)
+        return clients
+
+    def read_many(self, queries, raise_on_error=True, max_workers=None):
+        """Run independent queries concurrently on this and spare pooled connections.
+
+        ``queries`` maps a name to ``sql``, ``(sql, params)`` or ``(sql, params, cache_ttl)``.
+        Returns a ``QueryBatch`` of DataFrames with ``errors`` and ``timings`` (seconds); when
+        ``raise_on_error`` is set, any failure raises ``QueryBatchError`` after all queries
+        have finished. A ``TemporarilyUnavailableError`` is always re-raised as is, so the
+        report is parked rather than failed.
+        """
+        specs = {}
+        for name, spec in queries.items():
+            if isinstance(spec, str):
+                spec = (spec,)
+            sql, params, cache_ttl = (*spec, None, None)[:3]
+            specs[name] = (sql, params, cache_ttl)
+
+        batch = QueryBatch()
+        if not specs:
+            return batch
+        workers = max(1, min(max_workers or settings.DB_READ_MANY_WORKERS, len(specs)))
+        todo, out = deque(specs), {}
+        # Extra connections are only taken while the pool has them to spare, so a busy pool
+        # makes read_many run serially on our own connection instead of waiting for one.
+        clients = self._spare_connections(workers - 1)
+        oks = [False] * len(clients)
+        try:
+            if not clients:
+                self._drain(todo, specs, out)
+            else:
+                adapters = [self, *(self._for_connection(c) for c in clients)]
+                with ThreadPoolExecutor(
+                    max_workers=len(adapters), thread_name_prefix="read_many"
+                ) as ex:
+                    # Each thread runs in a copy of this context so its query spans join the trace.
+                    futures = [
+                        ex.submit(contextvars.copy_context().run, a._drain, todo, specs, out)
+                        for a in adapters
+                    ]
+                    oks = [fut.result() for fut in futures][1:]
+        finally:
+            for client, ok in zip(clients, oks, strict=True):
+                self.pool.release(client, commit=ok)
+
+        for name in specs:
+            df, err, elapsed = out[name]
+            batch[name] = df
+            batch.timings[name] = elapsed
+            if err is not None:
+                batch.errors[name] = err
+
+        for err in batch.errors.values():
+            if isinstance(err, TemporarilyUnavailableError):
+                raise err
+        if batch.errors and raise_on_error:
+            raise QueryBatchError(batch)
+        return batch
+
+    def _stream_cursor(self):
+        if hasattr(self.db, "stream_cursor"):
+            return self.db.stream_cursor()
+        return self.db.conn.cursor()
+
+    def read_sql_chunks(self, query, params=None, chunksize=None):
+        """Yield DataFrames of at most ``chunksize`` rows; memory stays bounded by one chunk."""
+        yield from cursors.iter_frames(self._stream_cursor, query, params, chunksize)
+
+    def read_arrow(self, query, params=None, batch_size=None):
+        """Read the full result into a ``pyarrow.Table`` without building per-row objects."""
+        with tracing.span("db.query", source=self._source, statement=_statement(query)):
+            return cursors.fetch_arrow(self._stream_cursor, query, params, batch_size)
+
+    def read_columns(self, query, params=None, batch_size=None):
+        """Read the full result as ``{column: numpy.ndarray}``."""
+        with tracing.span("db.query", source=self._source, statement=_statement(query)):
+            return cursors.fetch_columns(self._stream_cursor, query, params, batch_size)
 
     def is_record_exist(self, query, params=None):
-        cursor = self.db.conn.cursor()
-        cursor.execute(query, params)
-        result = cursor.fetchone()
-        return result is not None
+        def _exists():
+            cursor = self.db.conn.cursor()
+            cursor.execute(query, params)
+            return cursor.fetchone() is not None
+
+        with query_log.query(query, params) as entry:
+            exists = self._call(_exists, statement=query)
+            if entry is not None:
+                entry["rows"] = int(exists)
+        return exists
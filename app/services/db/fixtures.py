@@ -0,0 +1,208 @@
+"""Record-and-replay data fixtures for template scripts."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections.abc import Iterator
+from datetime import UTC, datetime
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+from pyarrow import feather
+
+from ...core.config import settings
+from .. import query_log
+from .cursors import table_columns
+from .db_adapter import DBAdapter
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "index.json"
+FORMAT_VERSION = 1
+
+
+class FixtureMissingError(LookupError):
+    """A replayed template ran a query that was not recorded."""
+
+
+class FixtureStore:
+    """A directory of recorded query results keyed by statement, params and read method."""
+
+    def __init__(self, directory: str, index: dict[str, Any] | None = None):
+        self.directory = directory
+        self.index = index or {"version": FORMAT_VERSION, "queries": {}}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory: str) -> FixtureStore:
+        with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as fh:
+            index = json.load(fh)
+        if index.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported fixture version {index.get('version')!r}")
+        return cls(directory, index)
+
+    @property
+    def template_id(self) -> str | None:
+        return self.index.get("template_id")
+
+    @property
+    def process_args(self) -> dict[str, Any]:
+        return self.index.get("process_args") or {}
+
+    @staticmethod
+    def key(kind: str, query: str, params: Any = None) -> str:
+        raw = "\x00".join(
+            (kind, " ".join(str(query).split()), json.dumps(params, sort_keys=True, default=str))
+        )
+        return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:20]
+
+    def _put(self, kind: str, query: str, params: Any, **entry: Any) -> str:
+        key = self.key(kind, query, params)
+        with self._lock:
+            self.index["queries"][key] = {
+                "kind": kind,
+                "fingerprint": query_log.fingerprint(query),
+                "statement": query_log.normalize(query)[: query_log.STATEMENT_MAX_CHARS],
+                "params_hash": query_log.params_hash(params),
+                **entry,
+            }
+        return key
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def put_table(self, kind: str, query: str, params: Any, table: pa.Table) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        key = self.key(kind, query, params)
+        feather.write_feather(table, self._path(f"{key}.arrow"), compression="zstd")
+        self._put(kind, query, params, file=f"{key}.arrow", rows=table.num_rows)
+
+    def put_frame(self, query: str, params: Any, df: pd.DataFrame) -> None:
+        try:
+            table = pa.Table.from_pandas(df, preserve_index=False)
+        except (pa.ArrowInvalid, pa.ArrowTypeError) as e:
+            logger.warning("Storing result as pickle, Arrow cannot represent it: %s", e)
+            os.makedirs(self.directory, exist_ok=True)
+            key = self.key("frame", query, params)
+            df.to_pickle(self._path(f"{key}.pkl"))
+            self._put("frame", query, params, file=f"{key}.pkl", rows=len(df))
+            return
+        self.put_table("frame", query, params, table)
+
+    def put_exists(self, query: str, params: Any, exists: bool) -> None:
+        self._put("exists", query, params, exists=bool(exists))
+
+    def _entry(self, kind: str, query: str, params: Any) -> dict[str, Any]:
+        entry = self.index["queries"].get(self.key(kind, query, params))
+        if entry is None:
+            raise FixtureMissingError(
+                f"No recorded {kind} result for {query_log.normalize(query)[:200]!r}"
+                f" with params {params!r}"
+            )
+        return entry
+
+    def table(self, query: str, params: Any = None) -> pa.Table:
+        entry = self._entry("arrow", query, params)
+        return feather.read_table(self._path(entry["file"]))
+
+    def frame(self, query: str, params: Any = None) -> pd.DataFrame:
+        entry = self._entry("frame", query, params)
+        if entry["file"].endswith(".pkl"):
+            return pd.read_pickle(self._path(entry["file"]))
+        return feather.read_table(self._path(entry["file"])).to_pandas()
+
+    def exists(self, query: str, params: Any = None) -> bool:
+        return self._entry("exists", query, params)["exists"]
+
+    def save(self, **meta: Any) -> None:
+        """Write ``index.json``; ``meta`` (template, args, etag, ...) is stored alongside."""
+        os.makedirs(self.directory, exist_ok=True)
+        with self._lock:
+            self.index.update(meta)
+            self.index.setdefault("recorded_at", datetime.now(UTC).isoformat())
+            with open(self._path(INDEX_FILE), "w", encoding="utf-8") as fh:
+                json.dump(self.index, fh, indent=2, default=str)
+
+
+class RecordingDBAdapter(DBAdapter):
+    """``DBAdapter`` that stores every result it reads in ``store``.
+
+    The query cache is bypassed so that fixtures hold what the database returned.
+    """
+
+    def __init__(self, db, store: FixtureStore, pool=None):
+        super().__init__(db, pool=pool)
+        self.store = store
+
+    def _for_connection(self, client) -> RecordingDBAdapter:
+        return RecordingDBAdapter(client, self.store, pool=self.pool)
+
+    def read_sql(self, query, params=None, none_on_empty_df=False, cache_ttl=None):
+        df = super().read_sql(query, params)
+        self.store.put_frame(query, params, df)
+        if df.empty and none_on_empty_df:
+            return None
+        return df
+
+    def read_sql_chunks(self, query, params=None, chunksize=None):
+        chunks = []
+        for chunk in super().read_sql_chunks(query, params, chunksize):
+            chunks.append(chunk)
+            yield chunk
+        df = pd.concat(chunks, ignore_index=True) if chunks else pd.DataFrame()
+        self.store.put_frame(query, params, df)
+
+    def read_arrow(self, query, params=None, batch_size=None):
+        table = super().read_arrow(query, params, batch_size)
+        self.store.put_table("arrow", query, params, table)
+        return table
+
+    def read_columns(self, query, params=None, batch_size=None):
+        return table_columns(self.read_arrow(query, params, batch_size))
+
+    def is_record_exist(self, query, params=None):
+        exists = super().is_record_exist(query, params)
+        self.store.put_exists(query, params, exists)
+        return exists
+
+
+class ReplayDBAdapter(DBAdapter):
+    """``DBAdapter`` that answers from a ``FixtureStore`` and never connects to a database.
+
+    Raises ``FixtureMissingError`` for queries that were not recorded, e.g. after the
+    template's SQL or arguments changed.
+    """
+
+    def __init__(self, store: FixtureStore):
+        self.db = None
+        self.pool = None
+        self.store = store
+        self.source_id = "replay"
+        self.breaker = None
+        self._source = "replay"
+
+    def read_sql(self, query, params=None, none_on_empty_df=False, cache_ttl=None):
+        df = self.store.frame(query, params)
+        if df.empty and none_on_empty_df:
+            return None
+        return df
+
+    def read_sql_chunks(self, query, params=None, chunksize=None) -> Iterator[pd.DataFrame]:
+        df = self.store.frame(query, params)
+        size = chunksize or settings.DB_FETCH_BATCH_SIZE
+        for start in range(0, len(df), size):
+            yield df.iloc[start : start + size].reset_index(drop=True)
+
+    def read_arrow(self, query, params=None, batch_size=None):
+        return self.store.table(query, params)
+
+    def read_columns(self, query, params=None, batch_size=None):
+        return table_columns(self.store.table(query, params))
+
+    def is_record_exist(self, query, params=None):
+        return self.store.exists(query, params)
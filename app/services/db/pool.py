@@ -0,0 +1,164 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from ..exceptions import TemporarilyUnavailableError
+from .resilience import CircuitBreaker, is_transient
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeoutError(TemporarilyUnavailableError):
+    """No connection freed up within ``checkout_timeout``; the report is parked, not failed."""
+
+
+class ConnectionPool:
+    """Per-process pool of connected DB clients.
+
+    Clients are created by ``factory`` (unconnected) and must expose ``connect``, ``close``,
+    ``ping`` and ``reset``. Idle clients older than ``idle_timeout`` are closed, clients are
+    pinged on checkout when ``pre_ping`` is set, and every client is reset (commit or rollback)
+    before it goes back to the pool.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Any],
+        max_size: int = 4,
+        idle_timeout: float = 300,
+        checkout_timeout: float = 30,
+        pre_ping: bool = True,
+        name: str = "db",
+        breaker: CircuitBreaker | None = None,
+    ):
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.pre_ping = pre_ping
+        self.name = name
+        self.breaker = breaker
+        self._cond = threading.Condition()
+        self._init_state()
+
+    def _init_state(self) -> None:
+        self._pid = os.getpid()
+        self._idle: deque[tuple[float, Any]] = deque()
+        self._size = 0
+
+    def _check_fork(self) -> None:
+        # Connections opened in a parent process must not be shared with forked workers.
+        if self._pid != os.getpid():
+            with self._cond:
+                if self._pid != os.getpid():
+                    self._init_state()
+
+    def _evict_idle(self) -> list[Any]:
+        expired = []
+        cutoff = time.monotonic() - self.idle_timeout
+        while self._idle and self._idle[0][0] < cutoff:
+            expired.append(self._idle.popleft()[1])
+            self._size -= 1
+        return expired
+
+    def _close_quietly(self, client: Any) -> None:
+        try:
+            client.close()
+        except Exception as e:
+            logger.debug("Error closing pooled %s connection: %s", self.name, e)
+
+    def acquire(self, block: bool = True) -> Any:
+        """Check out a client; with ``block=False``, return ``None`` if none is free right now."""
+        self._check_fork()
+        deadline = time.monotonic() + self.checkout_timeout
+        client = None
+        exhausted = False
+        with self._cond:
+            while True:
+                expired = self._evict_idle()
+                if self._idle:
+                    client = self._idle.pop()[1]
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                if not block:
+                    exhausted = True
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeoutError(
+                        f"Timed out waiting for a {self.name} connection "
+                        f"(max_size={self.max_size})"
+                    )
+                self._cond.wait(remaining)
+        for stale in expired:
+            self._close_quietly(stale)
+        if exhausted:
+            return None
+
+        if client is not None and self.pre_ping and not client.ping():
+            logger.info("Discarding dead pooled %s connection", self.name)
+            self._close_quietly(client)
+            client = None
+
+        if client is None:
+            try:
+                if self.breaker is not None:
+                    self.breaker.check()
+                client = self.factory()
+                client.connect()
+            except BaseException as e:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                if self.breaker is not None and isinstance(e, Exception) and is_transient(e):
+                    self.breaker.record_failure()
+                raise
+        return client
+
+    def release(self, client: Any, commit: bool = True) -> None:
+        if self._pid != os.getpid():
+            return
+        try:
+            client.reset(commit=commit)
+        except Exception as e:
+            logger.warning("Dropping %s connection that failed to reset: %s", self.name, e)
+            self._close_quietly(client)
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            return
+        with self._cond:
+            self._idle.append((time.monotonic(), client))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        client = self.acquire()
+        ok = False
+        try:
+            yield client
+            ok = True
+        finally:
+            self.release(client, commit=ok)
+
+    def close_all(self) -> None:
+        with self._cond:
+            idle = [c for _, c in self._idle]
+            self._size -= len(idle)
+            self._idle.clear()
+            self._cond.notify_all()
+        for client in idle:
+            self._close_quietly(client)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {"size": self._size, "idle": len(self._idle), "max_size": self.max_size}
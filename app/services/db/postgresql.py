@@ -0,0 +1,32 @@
+from __future__ import annotations
+
+import logging
+import uuid
+
+import psycopg2
+
+from ...core.config import settings
+from .base import DBClient
+
+logger = logging.getLogger(__name__)
+
+
+class PostgresClient(DBClient):
+    """psycopg2 client; streaming reads use named (server-side) cursors."""
+
+    kind = "postgres"
+
+    def _connect(self):
+        logger.debug("Connecting to PostgreSQL via psycopg2")
+        conn = psycopg2.connect(self.dsn, connect_timeout=self.timeout)
+        conn.autocommit = self.autocommit
+        return conn
+
+    def stream_cursor(self):
+        # Named cursors need a transaction; fall back to a client cursor in autocommit mode.
+        conn = self._ensure_conn()
+        if self.autocommit:
+            return conn.cursor()
+        cur = conn.cursor(name=f"nava_{uuid.uuid4().hex}")
+        cur.itersize = settings.DB_FETCH_BATCH_SIZE
+        return cur
@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import time
+from collections.abc import Callable
+from typing import Any
+
+import pandas as pd
+import pyarrow as pa
+from redis.exceptions import LockError
+
+from ...core.config import settings
+from ...core.serialization import decode_frame, encode_frame
+from ...db.redis_client import redis_bytes_client
+from ..placeholder_cache import canonical_json
+
+logger = logging.getLogger(__name__)
+
+
+class QueryCache:
+    """Redis cache of ``read_sql`` results stored as compressed Arrow IPC streams.
+
+    Concurrent misses on the same key are collapsed: one caller takes a short Redis lock and
+    runs the query, the others poll for its result and only run the query themselves if the
+    leader gives up (lock released or expired without a result).
+    """
+
+    def __init__(self):
+        self.r = redis_bytes_client
+
+    def key(self, query: str, params: Any = None, namespace: str = "") -> str:
+        normalized = " ".join(str(query).split())
+        digest = hashlib.sha256(
+            f"{namespace}\x00{normalized}\x00{canonical_json(params)}".encode()
+        ).hexdigest()
+        return f"querycache:{digest}"
+
+    def _get(self, key: str) -> pd.DataFrame | None:
+        try:
+            raw = self.r.get(key)
+        except Exception as e:
+            logger.warning("Query cache read failed: %s", e)
+            return None
+        return decode_frame(raw) if raw else None
+
+    def _set(self, key: str, df: pd.DataFrame, ttl: int) -> None:
+        try:
+            data = encode_frame(df)
+        except (pa.ArrowException, TypeError, ValueError) as e:
+            logger.warning("Query result not cacheable (%s); skipping", e)
+            return
+        if len(data) > settings.QUERY_CACHE_MAX_BYTES:
+            logger.debug("Query result too large to cache (%s bytes)", len(data))
+            return
+        try:
+            self.r.set(key, data, ex=ttl)
+        except Exception as e:
+            logger.warning("Query cache write failed: %s", e)
+
+    def get_or_load(
+        self,
+        key: str,
+        ttl: int,
+        loader: Callable[[], pd.DataFrame],
+    ) -> pd.DataFrame:
+        df = self._get(key)
+        if df is not None:
+            return df
+
+        deadline = time.monotonic() + settings.QUERY_CACHE_WAIT_TIMEOUT
+        delay = 0.05
+        while True:
+            lock = self.r.lock(
+                f"{key}:lock", timeout=settings.QUERY_CACHE_LOCK_TIMEOUT, blocking=False
+            )
+            try:
+                acquired = lock.acquire()
+            except Exception as e:
+                logger.warning("Query cache lock failed (%s); running query uncached", e)
+                return loader()
+
+            if acquired:
+                try:
+                    df = loader()
+                    self._set(key, df, ttl)
+                    return df
+                finally:
+                    try:
+                        lock.release()
+                    except LockError:
+                        pass
+
+            # Someone else is running this query; wait for its result.
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+            df = self._get(key)
+            if df is not None:
+                return df
+            if time.monotonic() >= deadline:
+                logger.info("Timed out waiting for in-flight query; running it directly")
+                return loader()
+
+
+query_cache = QueryCache()
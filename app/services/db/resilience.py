@@ -0,0 +1,187 @@
+"""Error classification, retry backoff and a Redis-backed circuit breaker for DB access."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import random
+import re
+import time
+from collections.abc import Callable, Iterator
+from typing import Any, TypeVar
+
+from ...core.config import settings
+from ...db.redis_client import redis_client
+from ..exceptions import CircuitOpenError
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# SQLSTATE classes/codes worth retrying: connection exceptions, timeouts, deadlocks.
+TRANSIENT_SQLSTATE_CLASSES = {"08"}
+TRANSIENT_SQLSTATES = {"HYT00", "HYT01", "40001", "40P01", "57P01", "57P03"}
+# SQL Server native error numbers reported under generic SQLSTATEs (deadlock, Azure throttling,
+# failover, transport-level errors).
+TRANSIENT_NATIVE_ERRORS = {
+    20, 64, 233, 1205, 4060, 10053, 10054, 10060, 10928, 10929, 40143, 40197, 40501, 40613,
+    49918, 49919, 49920,
+}  # fmt: skip
+
+_SQLSTATE_RE = re.compile(r"^[0-9A-Z]{5}$")
+_NATIVE_RE = re.compile(r"\((\d+)\)")
+
+
+def _chain(exc: BaseException) -> Iterator[BaseException]:
+    seen = set()
+    while exc is not None and id(exc) not in seen:
+        seen.add(id(exc))
+        yield exc
+        exc = exc.__cause__ or exc.__context__
+
+
+def sqlstate(exc: BaseException) -> str | None:
+    code = getattr(exc, "pgcode", None) or getattr(exc, "sqlstate", None)
+    if code:
+        return str(code)
+    if exc.args and isinstance(exc.args[0], str) and _SQLSTATE_RE.match(exc.args[0]):
+        return exc.args[0]  # pyodbc: Error(sqlstate, message)
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True when ``exc`` (or an exception it wraps) is worth retrying."""
+    for e in _chain(exc):
+        if isinstance(e, ConnectionError | TimeoutError):
+            return True
+        state = sqlstate(e)
+        if state is None:
+            continue
+        if state[:2] in TRANSIENT_SQLSTATE_CLASSES or state in TRANSIENT_SQLSTATES:
+            return True
+        message = " ".join(str(a) for a in e.args[1:])
+        return any(int(n) in TRANSIENT_NATIVE_ERRORS for n in _NATIVE_RE.findall(message))
+    return False
+
+
+def dsn_namespace(dsn: str | None) -> str:
+    """Short stable id for a data source, used to scope caches and breakers."""
+    return hashlib.sha256((dsn or "").encode("utf-8")).hexdigest()[:16]
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    return any((sqlstate(e) or "").startswith("08") for e in _chain(exc))
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given 0-based attempt."""
+    cap = min(settings.DB_RETRY_BACKOFF_MAX, settings.DB_RETRY_BACKOFF_BASE * (2**attempt))
+    return random.uniform(0, cap)
+
+
+class CircuitBreaker:
+    """Circuit breaker whose state is shared by all workers through Redis.
+
+    ``threshold`` transient failures within ``window`` seconds open the circuit for
+    ``cooldown`` seconds. The first call after the cooldown is a probe: another failure reopens
+    the circuit immediately, a success closes it. Redis errors never block calls.
+    """
+
+    def __init__(self, name: str, threshold: int, window: int, cooldown: int):
+        self.r = redis_client
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+
+    def _key(self, suffix: str) -> str:
+        return f"breaker:{self.name}:{suffix}"
+
+    def check(self) -> None:
+        try:
+            ttl = self.r.ttl(self._key("open"))
+        except Exception as e:
+            logger.warning("Circuit breaker %s unavailable: %s", self.name, e)
+            return
+        if ttl and ttl > 0:
+            raise CircuitOpenError(
+                f"Circuit {self.name!r} is open after repeated DB failures", retry_after=ttl
+            )
+
+    def record_success(self) -> None:
+        try:
+            self.r.delete(self._key("failures"), self._key("half_open"))
+        except Exception as e:
+            logger.debug("Circuit breaker %s reset failed: %s", self.name, e)
+
+    def record_failure(self) -> None:
+        try:
+            failures = self.r.incr(self._key("failures"))
+            if failures == 1:
+                self.r.expire(self._key("failures"), self.window)
+            if failures >= self.threshold or self.r.exists(self._key("half_open")):
+                self.open()
+        except Exception as e:
+            logger.debug("Circuit breaker %s update failed: %s", self.name, e)
+
+    def open(self) -> None:
+        logger.error("Opening circuit %s for %ss", self.name, self.cooldown)
+        pipe = self.r.pipeline()
+        pipe.set(self._key("open"), "1", ex=self.cooldown)
+        pipe.set(self._key("half_open"), "1", ex=self.cooldown + self.window)
+        pipe.delete(self._key("failures"))
+        pipe.execute()
+
+    def state(self) -> dict[str, Any]:
+        return {
+            "open_for": max(self.r.ttl(self._key("open")) or 0, 0),
+            "failures": int(self.r.get(self._key("failures")) or 0),
+            "half_open": bool(self.r.exists(self._key("half_open"))),
+        }
+
+
+def breaker_for(name: str) -> CircuitBreaker:
+    return CircuitBreaker(
+        name,
+        threshold=settings.DB_BREAKER_THRESHOLD,
+        window=settings.DB_BREAKER_WINDOW,
+        cooldown=settings.DB_BREAKER_COOLDOWN,
+    )
+
+
+def call_with_retries(
+    fn: Callable[[], T],
+    breaker: CircuitBreaker | None = None,
+    on_retry: Callable[[Exception], None] | None = None,
+) -> T:
+    """Run ``fn``, retrying transient errors with backoff; permanent errors raise at once."""
+    attempts = max(settings.DB_RETRY_ATTEMPTS, 1)
+    attempt = 0
+    while True:
+        if breaker is not None:
+            breaker.check()
+        try:
+            result = fn()
+        except Exception as e:
+            if not is_transient(e):
+                raise
+            if breaker is not None:
+                breaker.record_failure()
+            attempt += 1
+            if attempt >= attempts:
+                raise
+            delay = backoff_delay(attempt - 1)
+            logger.warning(
+                "Transient DB error (attempt %s/%s), retrying in %.2fs: %s",
+                attempt,
+                attempts,
+                delay,
+                e,
+            )
+            time.sleep(delay)
+            if on_retry is not None:
+                on_retry(e)
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
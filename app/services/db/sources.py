@@ -0,0 +1,81 @@
+"""Named data sources for template scripts (``DATA_SOURCES``)."""
+
+from __future__ import annotations
+
+import threading
+from functools import partial
+from typing import Any
+
+from ...core.config import settings
+from .mssql import MSSQLClient
+from .mysql import MySQLClient
+from .pool import ConnectionPool
+from .postgresql import PostgresClient
+from .resilience import breaker_for, dsn_namespace
+from .sqlite import SQLiteClient
+
+DEFAULT_SOURCE = "default"
+
+CLIENTS = {
+    "mssql": MSSQLClient,
+    "postgres": PostgresClient,
+    "mysql": MySQLClient,
+    "sqlite": SQLiteClient,
+}
+
+
+class UnknownDataSourceError(LookupError):
+    pass
+
+
+class DataSourceRegistry:
+    def __init__(self):
+        self._pools: dict[str, ConnectionPool] = {}
+        self._lock = threading.Lock()
+
+    def configs(self) -> dict[str, dict[str, Any]]:
+        configs = {DEFAULT_SOURCE: {"kind": "mssql", "dsn": settings.MSSQL_DSN}}
+        configs.update(settings.DATA_SOURCES)
+        return configs
+
+    def config(self, name: str) -> dict[str, Any]:
+        cfg = self.configs().get(name)
+        if cfg is None:
+            raise UnknownDataSourceError(f"Unknown data source: {name!r}")
+        if cfg.get("kind", "mssql") not in CLIENTS:
+            raise UnknownDataSourceError(f"Unsupported kind for data source {name!r}")
+        return cfg
+
+    def _build_pool(self, name: str) -> ConnectionPool:
+        cfg = self.config(name)
+        client_cls = CLIENTS[cfg.get("kind", "mssql")]
+        dsn = cfg.get("dsn") or ""
+        return ConnectionPool(
+            partial(client_cls, dsn, timeout=cfg.get("timeout", 30)),
+            max_size=cfg.get("pool_size", settings.MSSQL_POOL_SIZE),
+            idle_timeout=cfg.get("idle_timeout", settings.MSSQL_POOL_IDLE_TIMEOUT),
+            checkout_timeout=cfg.get("pool_timeout", settings.MSSQL_POOL_TIMEOUT),
+            pre_ping=cfg.get("pre_ping", settings.MSSQL_POOL_PRE_PING),
+            name=name,
+            breaker=breaker_for(f"db:{dsn_namespace(dsn)}"),
+        )
+
+    def pool(self, name: str | None = None) -> ConnectionPool:
+        name = name or DEFAULT_SOURCE
+        pool = self._pools.get(name)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.get(name)
+                if pool is None:
+                    pool = self._pools[name] = self._build_pool(name)
+        return pool
+
+    def concurrency_limit(self, name: str) -> int:
+        """Fetches allowed at once on ``name`` across all workers (0 = unlimited)."""
+        return int(self.config(name).get("max_concurrency", settings.SOURCE_CONCURRENCY_LIMIT))
+
+    def source_for(self, meta: dict | None) -> str:
+        return ((meta or {}).get("source") if isinstance(meta, dict) else None) or DEFAULT_SOURCE
+
+
+data_sources = DataSourceRegistry()
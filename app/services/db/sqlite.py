@@ -0,0 +1,21 @@
+from __future__ import annotations
+
+import logging
+import sqlite3
+
+from .base import DBClient
+
+logger = logging.getLogger(__name__)
+
+
+class SQLiteClient(DBClient):
+    """sqlite3 client for local benchmarking and testing; ``dsn`` is a file path."""
+
+    kind = "sqlite"
+
+    def _connect(self):
+        logger.debug("Connecting to SQLite %s", self.dsn)
+        conn = sqlite3.connect(self.dsn, timeout=self.timeout, check_same_thread=False)
+        if self.autocommit:
+            conn.isolation_level = None
+        return conn
@@ -12,3 +12,23 @@ class TestExecutionError(Exception):
 
 class NoDataFoundError(Exception):
     """For when 'test.py' check fails (record not found / args invalid)."""
+
+
+class TemporarilyUnavailableError(Exception):
+    """A dependency refused work for now; the caller should retry after ``retry_after`` s."""
+
+    def __init__(self, message: str, retry_after: float = 30):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(TemporarilyUnavailableError):
+    pass
+
+
+class ConcurrencyLimitError(TemporarilyUnavailableError):
+    """All concurrency slots for a template or data source are taken."""
+
+
+class DeadlineExceededError(Exception):
+    """A report's deadline passed before the stage could run."""
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from jinja2 import BaseLoader, Environment, Template
+from jinja2.bccache import BytecodeCache, FileSystemBytecodeCache, MemcachedBytecodeCache
+
+from ..core import metrics
+from ..core.config import settings
+from ..db.redis_client import redis_bytes_client
+
+logger = logging.getLogger(__name__)
+
+
+class _SourceLoader(BaseLoader):
+    """Serves a single, already fetched source so Jinja's ``load`` can use the bytecode cache."""
+
+    def __init__(self, source: str):
+        self.source = source
+
+    def get_source(self, environment, template):
+        return self.source, None, None
+
+
+def _bytecode_cache() -> BytecodeCache | None:
+    kind = (settings.JINJA_BYTECODE_CACHE or "").lower()
+    if not kind:
+        return None
+    if kind == "fs":
+        os.makedirs(settings.JINJA_BYTECODE_CACHE_DIR, exist_ok=True)
+        return FileSystemBytecodeCache(settings.JINJA_BYTECODE_CACHE_DIR)
+    if kind == "redis":
+        return MemcachedBytecodeCache(
+            redis_bytes_client,
+            prefix="jinja2:bytecode:",
+            timeout=settings.JINJA_BYTECODE_CACHE_TTL,
+            ignore_memcache_errors=True,
+        )
+    logger.warning("Unknown JINJA_BYTECODE_CACHE=%r; bytecode cache disabled", kind)
+    return None
+
+
+env = Environment(loader=BaseLoader(), autoescape=False, bytecode_cache=_bytecode_cache())
+
+
+class TemplateCache:
+    """Per-process LRU of compiled Jinja templates keyed by ``(template_id, etag)``."""
+
+    def __init__(self, environment: Environment, maxsize: int = 64):
+        self.env = environment
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[str, Template]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_id: str, etag: str, source: str) -> Template:
+        key = (template_id, etag)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_requests.labels("jinja", "hit").inc()
+                return entry[1]
+
+        name = f"{template_id}@{etag}"
+        tmpl = _SourceLoader(source).load(self.env, name, self.env.make_globals(None))
+        metrics.cache_requests.labels("jinja", "miss").inc()
+        with self._lock:
+            self.misses += 1
+            for stale in [k for k in self._entries if k[0] == template_id and k != key]:
+                del self._entries[stale]
+            self._entries[key] = (source, tmpl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return tmpl
+
+    def invalidate(self, template_id: str | None = None) -> None:
+        with self._lock:
+            if template_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == template_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+template_cache = TemplateCache(env, maxsize=settings.JINJA_TEMPLATE_CACHE_SIZE)
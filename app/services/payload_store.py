@@ -0,0 +1,162 @@
+"""Claim-check store for large intermediate pipeline data (placeholders, rendered HTML).
+
+Chained tasks pass small ``{"__payload_ref__": key}`` references through the broker instead of
+the payload itself. Payloads are JSON-encoded with kombu's encoder, zlib-compressed above
+``PAYLOAD_COMPRESS_MIN_BYTES`` and kept in Redis or on a shared volume for
+``PAYLOAD_STORE_TTL`` seconds, or until the report finishes or fails.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import logging
+import os
+import shutil
+import time
+import zlib
+from pathlib import Path
+from typing import Any
+
+from kombu.utils.json import dumps, loads
+
+from ..core.config import settings
+from ..db.redis_client import redis_bytes_client
+
+logger = logging.getLogger(__name__)
+
+REF_KEY = "__payload_ref__"
+# Every name the pipeline stores per report; deletes address these keys directly.
+PAYLOAD_NAMES = ("placeholders", "html")
+_RAW = b"\x00"
+_ZLIB = b"\x01"
+
+
+def _encode(value: Any) -> bytes:
+    data = dumps(value).encode("utf-8")
+    if len(data) >= settings.PAYLOAD_COMPRESS_MIN_BYTES:
+        return _ZLIB + zlib.compress(data, 6)
+    return _RAW + data
+
+
+def _decode(blob: bytes) -> Any:
+    marker, body = blob[:1], blob[1:]
+    if marker == _ZLIB:
+        body = zlib.decompress(body)
+    return loads(body.decode("utf-8"))
+
+
+def encoded_size(value: Any) -> int | None:
+    """Uncompressed JSON size of ``value``, for payloads that are not stored."""
+    if isinstance(value, str):
+        return len(value.encode("utf-8"))
+    try:
+        return len(dumps(value).encode("utf-8"))
+    except (TypeError, ValueError):
+        return None
+
+
+def is_ref(value: Any) -> bool:
+    return isinstance(value, dict) and len(value) == 1 and REF_KEY in value
+
+
+class PayloadStore:
+    def __init__(self, backend: str = "", directory: str = "", ttl: int = 3600):
+        self.backend = (backend or "").lower()
+        self.directory = directory
+        self.ttl = ttl
+        self.r = redis_bytes_client
+        if self.backend not in ("", "redis", "file"):
+            logger.warning("Unknown PAYLOAD_STORE=%r; claim-check disabled", backend)
+            self.backend = ""
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.backend)
+
+    def _redis_key(self, report_id: str, name: str) -> str:
+        return f"payload:{report_id}:{name}"
+
+    def _report_dir(self, report_id: str) -> str:
+        return os.path.join(self.directory, str(report_id))
+
+    def put(self, report_id: str, name: str, value: Any) -> dict[str, str]:
+        return self._write(report_id, name, _encode(value))
+
+    def _write(self, report_id: str, name: str, blob: bytes) -> dict[str, str]:
+        if self.backend == "redis":
+            key = self._redis_key(report_id, name)
+            self.r.set(key, blob, ex=self.ttl)
+        else:
+            os.makedirs(self._report_dir(report_id), exist_ok=True)
+            key = os.path.join(str(report_id), name)
+            path = os.path.join(self.directory, key)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as fh:
+                fh.write(blob)
+            os.replace(tmp, path)
+        return {REF_KEY: key}
+
+    def get(self, ref: dict[str, str]) -> Any:
+        key = ref[REF_KEY]
+        if self.backend == "redis":
+            blob = self.r.get(key)
+        else:
+            path = os.path.join(self.directory, key)
+            blob = None
+            if os.path.exists(path):
+                with open(path, "rb") as fh:
+                    blob = fh.read()
+        if blob is None:
+            raise LookupError(f"Payload {key} expired or missing")
+        return _decode(blob)
+
+    def offload(self, report_id: str, name: str, value: Any) -> tuple[Any, int | None]:
+        """Store ``value`` if enabled; returns its ref (or ``value``) and the stored size."""
+        if not self.enabled:
+            return value, None
+        blob = _encode(value)
+        return self._write(report_id, name, blob), len(blob)
+
+    def resolve(self, value: Any) -> Any:
+        return self.get(value) if is_ref(value) else value
+
+    def delete_report(self, report_id: str) -> None:
+        self.delete_reports([report_id])
+
+    def delete_reports(self, report_ids: list[str]) -> None:
+        """Drop the payloads of ``report_ids``; Redis keys go in one pipelined ``DEL``."""
+        report_ids = [str(report_id) for report_id in report_ids if report_id]
+        if not self.enabled or not report_ids:
+            return
+        try:
+            if self.backend == "redis":
+                pipe = self.r.pipeline(transaction=False)
+                for report_id in report_ids:
+                    pipe.delete(*(self._redis_key(report_id, name) for name in PAYLOAD_NAMES))
+                pipe.execute()
+            else:
+                for report_id in report_ids:
+                    report_dir = Path(self._report_dir(report_id))
+                    for name in PAYLOAD_NAMES:
+                        (report_dir / name).unlink(missing_ok=True)
+                    with contextlib.suppress(OSError):
+                        report_dir.rmdir()
+        except Exception as e:
+            logger.warning("Failed cleaning payloads for reports %s: %s", report_ids, e)
+
+    def purge_expired(self) -> int:
+        """Remove file payloads older than the TTL (Redis expires keys on its own)."""
+        if self.backend != "file" or not os.path.isdir(self.directory):
+            return 0
+        cutoff = time.time() - self.ttl
+        removed = 0
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and entry.stat().st_mtime < cutoff:
+                shutil.rmtree(entry.path, ignore_errors=True)
+                removed += 1
+        return removed
+
+
+payload_store = PayloadStore(
+    settings.PAYLOAD_STORE, settings.PAYLOAD_STORE_DIR, settings.PAYLOAD_STORE_TTL
+)
@@ -0,0 +1,94 @@
+import hashlib
+import json
+import logging
+import re
+from typing import Any
+
+from kombu.utils.json import dumps, loads
+
+from ..core import metrics
+from ..db.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+
+def canonical_json(obj: Any) -> str:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), default=str)
+
+
+def args_digest(process_args: dict[str, Any]) -> str:
+    return hashlib.sha256(canonical_json(process_args).encode("utf-8")).hexdigest()
+
+
+def _glob_escape(text: str) -> str:
+    return re.sub(r"([*?\[\]\\])", r"\\\1", text)
+
+
+class PlaceholderCache:
+    """Redis cache for ``fetch_placeholders`` results.
+
+    Opt-in per template via ``"cache": {"ttl": <seconds>}`` in ``map.json``. Keys embed the
+    template etag, a hash of the map entry and the asset contents, so a new template version
+    never sees older results.
+    """
+
+    def __init__(self):
+        self.r = redis_client
+
+    def _data_key(self, template_id: str, etag: str, digest: str) -> str:
+        return f"placeholders:{template_id}:data:{etag[:16]}:{digest}"
+
+    def _stats_key(self, template_id: str) -> str:
+        return f"placeholders:{template_id}:stats"
+
+    @staticmethod
+    def ttl_for(meta: dict | None) -> int:
+        opts = (meta.get("cache") or {}) if isinstance(meta, dict) else {}
+        try:
+            return max(int(opts.get("ttl") or 0), 0)
+        except (TypeError, ValueError):
+            return 0
+
+    def get(self, template_id: str, etag: str, process_args: dict[str, Any]) -> dict | None:
+        key = self._data_key(template_id, etag, args_digest(process_args))
+        try:
+            raw = self.r.get(key)
+            self.r.hincrby(self._stats_key(template_id), "hits" if raw else "misses", 1)
+        except Exception as e:
+            logger.warning("Placeholder cache read failed for %s: %s", template_id, e)
+            return None
+        metrics.cache_requests.labels("placeholders", "hit" if raw else "miss").inc()
+        return loads(raw) if raw else None
+
+    def set(
+        self,
+        template_id: str,
+        etag: str,
+        process_args: dict[str, Any],
+        placeholders: dict[str, Any],
+        ttl: int,
+    ) -> None:
+        key = self._data_key(template_id, etag, args_digest(process_args))
+        try:
+            self.r.set(key, dumps(placeholders), ex=ttl)
+        except Exception as e:
+            logger.warning("Placeholder cache write failed for %s: %s", template_id, e)
+
+    def clear(self, template_id: str) -> int:
+        pattern = f"placeholders:{_glob_escape(template_id)}:data:*"
+        keys = list(self.r.scan_iter(match=pattern, count=500))
+        if keys:
+            self.r.delete(*keys)
+        return len(keys)
+
+    def stats(self, template_id: str) -> dict[str, int]:
+        raw = self.r.hgetall(self._stats_key(template_id)) or {}
+        pattern = f"placeholders:{_glob_escape(template_id)}:data:*"
+        return {
+            "hits": int(raw.get("hits", 0)),
+            "misses": int(raw.get("misses", 0)),
+            "entries": sum(1 for _ in self.r.scan_iter(match=pattern, count=500)),
+        }
+
+
+placeholder_cache = PlaceholderCache()
@@ -0,0 +1,233 @@
+"""On-demand cProfile or sampling profiles of the fetch and render stages."""
+
+from __future__ import annotations
+
+import cProfile
+import logging
+import os
+import pstats
+import shutil
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from ..core.config import settings
+from ..db.redis_client import redis_client
+
+logger = logging.getLogger(__name__)
+
+PROFILE_MODES = ("cprofile", "sampling")
+EXTENSIONS = {"cprofile": ".pstats", "sampling": ".collapsed"}
+
+
+def _report_key(report_id: str) -> str:
+    return f"profile:report:{report_id}"
+
+
+def _template_key(template_id: str) -> str:
+    return f"profile:template:{template_id}"
+
+
+def arm_report(report_id: str) -> None:
+    redis_client.set(_report_key(report_id), 1, ex=settings.PROFILE_FLAG_TTL)
+
+
+def arm_template(template_id: str, runs: int) -> None:
+    """Profile the next ``runs`` reports of ``template_id``; ``runs=0`` disarms."""
+    if runs <= 0:
+        redis_client.delete(_template_key(template_id))
+    else:
+        redis_client.set(_template_key(template_id), runs, ex=settings.PROFILE_FLAG_TTL)
+
+
+def remaining_runs(template_id: str) -> int:
+    return max(int(redis_client.get(_template_key(template_id)) or 0), 0)
+
+
+def claim(report_id: str, template_id: str) -> bool:
+    """Whether this report's run is profiled, taking one template run if the report isn't armed.
+
+    Called when the fetch stage starts; later stages use ``armed`` so a report takes at most
+    one template run.
+    """
+    try:
+        if redis_client.exists(_report_key(report_id)):
+            return True
+        key = _template_key(template_id)
+        if int(redis_client.get(key) or 0) > 0 and redis_client.decr(key) >= 0:
+            arm_report(report_id)
+            return True
+    except Exception as e:
+        logger.warning("Profiling flags unavailable: %s", e)
+    return False
+
+
+def armed(report_id: str) -> bool:
+    try:
+        return bool(redis_client.exists(_report_key(report_id)))
+    except Exception as e:
+        logger.warning("Profiling flags unavailable: %s", e)
+        return False
+
+
+def _mode() -> str:
+    mode = settings.PROFILE_MODE
+    if mode not in PROFILE_MODES:
+        logger.warning("Unknown profile mode %r; using cprofile", mode)
+        mode = "cprofile"
+    return mode
+
+
+def _report_dir(report_id: str) -> str:
+    return os.path.join(settings.PROFILE_DIR, str(report_id))
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer and counts collapsed stacks."""
+
+    def __init__(self, root: str, interval: float, skip: int = 0):
+        self.root = root
+        self.interval = interval
+        self.skip = skip
+        self.samples: Counter[str] = Counter()
+        self._target = threading.get_ident()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                filename = os.path.basename(code.co_filename)
+                stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            self.samples[";".join([self.root, *stack[self.skip :]])] += 1
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def dump(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as fh:
+            for stack, count in self.samples.most_common():
+                fh.write(f"{stack} {count}\n")
+
+
+@contextmanager
+def profile(report_ids: str | list[str], stage: str, enabled: bool = True) -> Iterator[None]:
+    """Profile the enclosed block and store the artifact for each of ``report_ids``.
+
+    Only the calling thread is profiled; ``read_many`` queries on pool threads show up as time
+    spent waiting on their futures.
+    """
+    if not enabled:
+        yield
+        return
+
+    mode = _mode()
+    profiler: cProfile.Profile | StackSampler | None = None
+    try:
+        if mode == "cprofile":
+            profiler = cProfile.Profile()
+            profiler.enable()
+        else:
+            # Stacks start at the frame that entered this block, not at the worker loop.
+            caller, depth = sys._getframe(2), 0
+            while caller is not None:
+                depth, caller = depth + 1, caller.f_back
+            profiler = StackSampler(
+                stage, settings.PROFILE_SAMPLE_INTERVAL_MS / 1000, skip=depth - 1
+            )
+            profiler.start()
+    except ValueError as e:
+        # Another profiler (a debugger, coverage) already owns the interpreter hook.
+        logger.warning("Could not start profiler for %s: %s", stage, e)
+        profiler = None
+
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        if profiler is not None:
+            if isinstance(profiler, cProfile.Profile):
+                profiler.disable()
+            else:
+                profiler.stop()
+            ids = report_ids if isinstance(report_ids, list) else [report_ids]
+            for report_id in ids:
+                _store(profiler, report_id, stage, mode)
+            logger.info(
+                "Profiled %s for %s report(s) in %.0fms",
+                stage,
+                len(ids),
+                (time.perf_counter() - t0) * 1000,
+            )
+
+
+def _store(profiler, report_id: str, stage: str, mode: str) -> None:
+    try:
+        directory = _report_dir(report_id)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{stage}{EXTENSIONS[mode]}")
+        if isinstance(profiler, cProfile.Profile):
+            profiler.dump_stats(path)
+        else:
+            profiler.dump(path)
+    except Exception as e:
+        logger.warning("Failed to store %s profile for report %s: %s", stage, report_id, e)
+
+
+def artifacts(report_id: str) -> list[str]:
+    """Stored artifact file names for a report, e.g. ``["fetch_placeholders.pstats"]``."""
+    try:
+        return sorted(os.listdir(_report_dir(report_id)))
+    except FileNotFoundError:
+        return []
+
+
+def load(report_id: str, fmt: str | None = None, stage: str | None = None) -> tuple[bytes, str]:
+    """Artifacts of a report merged into one download; returns ``(body, extension)``.
+
+    pstats files are combined with ``pstats.Stats.add``; collapsed stacks are concatenated
+    (each stack is rooted at its stage name). Raises ``FileNotFoundError`` if none match.
+    """
+    names = artifacts(report_id)
+    if stage:
+        names = [n for n in names if os.path.splitext(n)[0] == stage]
+    if fmt is None:
+        fmt = "pstats" if any(n.endswith(".pstats") for n in names) else "collapsed"
+    ext = f".{fmt}"
+    paths = [os.path.join(_report_dir(report_id), n) for n in names if n.endswith(ext)]
+    if not paths:
+        raise FileNotFoundError(report_id)
+
+    if fmt == "collapsed":
+        chunks = []
+        for path in paths:
+            with open(path, "rb") as fh:
+                chunks.append(fh.read())
+        return b"".join(chunks), ext
+
+    stats = pstats.Stats(paths[0])
+    for path in paths[1:]:
+        stats.add(path)
+    merged = os.path.join(_report_dir(report_id), f".merged-{os.getpid()}.tmp")
+    try:
+        stats.dump_stats(merged)
+        with open(merged, "rb") as fh:
+            return fh.read(), ext
+    finally:
+        os.remove(merged)
+
+
+def clear(report_id: str) -> None:
+    shutil.rmtree(_report_dir(report_id), ignore_errors=True)
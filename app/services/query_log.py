@@ -0,0 +1,241 @@
+"""Per-query log of template data fetches (``report_queries``)."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import re
+import time
+import uuid
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import func, insert
+
+from ..core.config import settings
+from ..db.postgres import SessionLocal
+from ..models import ReportQuery
+
+logger = logging.getLogger(__name__)
+
+STATEMENT_MAX_CHARS = 2000
+TOP_ORDERS = ("total", "avg", "p95", "count")
+
+_COMMENTS = re.compile(r"--[^\n]*|/\*.*?\*/", re.S)
+_STRINGS = re.compile(r"N?'(?:[^']|'')*'")
+_NUMBERS = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?![\w.])")
+_PLACEHOLDERS = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+")
+_IN_LISTS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+_log: ContextVar[list[dict[str, Any]] | None] = ContextVar("query_log", default=None)
+_entry: ContextVar[dict[str, Any] | None] = ContextVar("query_log_entry", default=None)
+
+
+def normalize(sql: str) -> str:
+    """SQL with comments, literals and bind markers reduced so that runs of one statement match.
+
+    ``IN (?, ?, ?)`` lists of any length collapse to ``IN (?+)``.
+    """
+    sql = _COMMENTS.sub(" ", str(sql))
+    sql = _STRINGS.sub("?", sql)
+    sql = _NUMBERS.sub("?", sql)
+    sql = _PLACEHOLDERS.sub("?", sql)
+    sql = _IN_LISTS.sub("(?+)", sql)
+    return " ".join(sql.split())
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize(sql).lower().encode("utf-8")).hexdigest()[:16]
+
+
+def params_hash(params: Any) -> str | None:
+    if params is None:
+        return None
+    raw = json.dumps(params, sort_keys=True, default=str)
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def frame_bytes(df) -> int | None:
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return None
+
+
+@contextmanager
+def query(statement: str, params: Any = None) -> Iterator[dict[str, Any] | None]:
+    """Log the query run in the block; yields its entry (``None`` outside ``collect``).
+
+    Callers fill in ``rows``, ``bytes`` and ``cached``; retries are counted by ``retried``.
+    """
+    log = _log.get()
+    if log is None:
+        yield None
+        return
+    entry: dict[str, Any] = {
+        "execution_id": uuid.uuid4(),
+        "fingerprint": fingerprint(statement),
+        "statement": normalize(statement)[:STATEMENT_MAX_CHARS],
+        "params_hash": params_hash(params),
+        "started_at": datetime.now(UTC),
+        "rows": None,
+        "bytes": None,
+        "retries": 0,
+        "cached": False,
+        "ok": False,
+    }
+    token = _entry.set(entry)
+    t0 = time.perf_counter()
+    try:
+        yield entry
+        entry["ok"] = True
+    finally:
+        entry["duration_ms"] = (time.perf_counter() - t0) * 1000
+        _entry.reset(token)
+        log.append(entry)
+
+
+def retried() -> None:
+    entry = _entry.get()
+    if entry is not None:
+        entry["retries"] += 1
+
+
+def record(rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(insert(ReportQuery), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("Failed to record report queries: %s", e)
+    finally:
+        db.close()
+
+
+@contextmanager
+def collect(report_ids: str | list[str], template_id: str, stage: str) -> Iterator[None]:
+    """Log the queries run in the block against each of ``report_ids``.
+
+    A batched fetch serves several reports with one query; its rows share an
+    ``execution_id`` so aggregates can count it once.
+    """
+    if not settings.REPORT_QUERY_LOG:
+        yield
+        return
+    log: list[dict[str, Any]] = []
+    token = _log.set(log)
+    try:
+        yield
+    finally:
+        _log.reset(token)
+        ids = report_ids if isinstance(report_ids, list) else [report_ids]
+        record(
+            [
+                {
+                    **entry,
+                    "report_id": report_id,
+                    "template_id": template_id,
+                    "stage": stage,
+                    "reports": len(ids),
+                }
+                for report_id in ids
+                for entry in log
+            ]
+        )
+
+
+def top(
+    db,
+    since: datetime,
+    template_id: str | None = None,
+    order: str = "total",
+    limit: int = 20,
+) -> list[dict[str, Any]]:
+    """Statements by total (or average, p95, count of) execution time since ``since``.
+
+    A batched fetch logs one row per report it served; statistics use one row per execution.
+    """
+    runs = db.query(
+        ReportQuery.template_id.label("template_id"),
+        ReportQuery.fingerprint.label("fingerprint"),
+        func.min(ReportQuery.statement).label("statement"),
+        func.max(ReportQuery.duration_ms).label("duration_ms"),
+        func.max(ReportQuery.rows).label("rows"),
+        func.max(ReportQuery.bytes).label("bytes"),
+        func.max(ReportQuery.retries).label("retries"),
+        func.bool_or(ReportQuery.cached).label("cached"),
+        func.bool_and(ReportQuery.ok).label("ok"),
+    ).filter(ReportQuery.started_at >= since)
+    if template_id:
+        runs = runs.filter(ReportQuery.template_id == template_id)
+    runs = runs.group_by(
+        ReportQuery.template_id, ReportQuery.fingerprint, ReportQuery.execution_id
+    ).subquery()
+
+    executions = func.count()
+    total = func.sum(runs.c.duration_ms)
+    avg = func.avg(runs.c.duration_ms)
+    p95 = func.percentile_cont(0.95).within_group(runs.c.duration_ms)
+    order_by = {"total": total, "avg": avg, "p95": p95, "count": executions}[order]
+
+    rows = (
+        db.query(
+            runs.c.template_id,
+            runs.c.fingerprint,
+            func.min(runs.c.statement),
+            executions,
+            total,
+            avg,
+            p95,
+            func.max(runs.c.duration_ms),
+            func.avg(runs.c.rows),
+            func.avg(runs.c.bytes),
+            func.sum(runs.c.retries),
+            func.count().filter(runs.c.cached.is_(True)),
+            func.count().filter(runs.c.ok.is_(False)),
+        )
+        .group_by(runs.c.template_id, runs.c.fingerprint)
+        .order_by(order_by.desc())
+        .limit(limit)
+        .all()
+    )
+
+    def num(value):
+        return float(value) if value is not None else None
+
+    return [
+        {
+            "template_id": row[0],
+            "fingerprint": row[1],
+            "statement": row[2],
+            "executions": round(num(row[3]) or 0),
+            "total_ms": num(row[4]),
+            "avg_ms": num(row[5]),
+            "p95_ms": num(row[6]),
+            "max_ms": num(row[7]),
+            "avg_rows": num(row[8]),
+            "avg_bytes": num(row[9]),
+            "retries": round(num(row[10]) or 0),
+            "cached": round(num(row[11]) or 0),
+            "failed": round(num(row[12]) or 0),
+        }
+        for row in rows
+    ]
+
+
+def purge(older_than_days: int) -> int:
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(UTC) - timedelta(days=older_than_days)
+        n = db.query(ReportQuery).filter(ReportQuery.started_at < cutoff).delete()
+        db.commit()
+        return n
+    finally:
+        db.close()
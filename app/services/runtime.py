@@ -4,8 +4,13 @@
 import math
 import os
 import re
+import threading
+from collections import OrderedDict
 from datetime import datetime, timezone
-from types import SimpleNamespace
+from types import CodeType, SimpleNamespace
+
+from ..core import metrics
+from ..core.config import settings
 
 SAFE_GLOBALS = {
     "__name__": "__template_script__",
@@ -18,9 +23,67 @@
 }
 
 
-def exec_module(source: str) -> SimpleNamespace:
+class CodeCache:
+    """Per-process LRU of compiled template scripts.
+
+    Entries are keyed by ``(template_id, kind)`` and tagged with the template etag. A lookup
+    whose etag (or source) no longer matches recompiles and replaces the stale entry.
+    """
+
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[tuple[str, str], tuple[str, str, CodeType]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_id: str, kind: str, etag: str, source: str) -> CodeType:
+        key = (template_id, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == etag and entry[1] == source:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                metrics.cache_requests.labels("code", "hit").inc()
+                return entry[2]
+
+        code = compile(source, f"<template:{template_id}:{kind}>", "exec")
+        metrics.cache_requests.labels("code", "miss").inc()
+        with self._lock:
+            self.misses += 1
+            self._entries[key] = (etag, source, code)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return code
+
+    def invalidate(self, template_id: str | None = None) -> None:
+        with self._lock:
+            if template_id is None:
+                self._entries.clear()
+                return
+            for key in [k for k in self._entries if k[0] == template_id]:
+                del self._entries[key]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"size": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+code_cache = CodeCache(maxsize=settings.TEMPLATE_CODE_CACHE_SIZE)
+
+
+def exec_module(
+    source: str,
+    template_id: str | None = None,
+    kind: str = "logic",
+    etag: str = "",
+) -> SimpleNamespace:
     env: dict = dict(SAFE_GLOBALS)
-    exec(source, env, env)
+    if template_id is None:
+        exec(source, env, env)
+    else:
+        exec(code_cache.get(template_id, kind, etag, source), env, env)
     return SimpleNamespace(**env)
 
 
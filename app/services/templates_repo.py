@@ -8,6 +8,7 @@
 
 from ..core.config import settings
 from ..db.redis_client import redis_client
+from .placeholder_cache import placeholder_cache
 
 logger = logging.getLogger(__name__)
 
@@ -106,11 +107,42 @@ def _keys(self, tid: str) -> dict:
             "logic": f"{base}:logic",
             "test": f"{base}:test",
             "etag": f"{base}:etag",
+            "source": f"{base}:source",
         }
 
     def _template_etag(self, template: dict) -> str:
         return _sha256_hex(json.dumps(template, sort_keys=True))
 
+    def _assets_etag(self, template: dict, html: str, logic: str, test: str) -> str:
+        # Editing a script without touching map.json must still change the etag.
+        return _sha256_hex("\x00".join((json.dumps(template, sort_keys=True), html, logic, test)))
+
+    def _store_assets(self, template: dict, html: str, logic: str, test: str) -> str:
+        tid = template["id"]
+        keys = self._keys(tid)
+        new_etag = self._assets_etag(template, html, logic, test)
+        old_etag = self.r.get(keys["etag"])
+        self.r.set(keys["meta"], json.dumps(template))
+        self.r.set(keys["html"], html)
+        self.r.set(keys["logic"], logic)
+        self.r.set(keys["test"], test)
+        self.r.set(keys["source"], self._template_etag(template))
+        self.r.set(keys["etag"], new_etag)
+        self._on_etag_change(tid, old_etag, new_etag)
+        return new_etag
+
+    def get_template_etag(self, template_id: str) -> str | None:
+        etag = self.r.get(self._keys(template_id)["etag"])
+        if etag:
+            return etag
+        tmpl = self.get_template(template_id)
+        return self._template_etag(tmpl) if tmpl else None
+
+    def _on_etag_change(self, tid: str, old_etag: str | None, new_etag: str) -> None:
+        if old_etag and old_etag != new_etag:
+            n = placeholder_cache.clear(tid)
+            logger.info("Template %s changed; cleared %s cached placeholder sets", tid, n)
+
     def fetch_and_cache_assets(self, template: dict, force: bool = False) -> None:
         if settings.LOAD_TEMPLATES_LOCAL:
             return self._fetch_and_cache_assets_local(template)
@@ -118,10 +150,7 @@ def fetch_and_cache_assets(self, template: dict, force: bool = False) -> None:
             return self._fetch_and_cache_assets(template, force)
 
     def _fetch_and_cache_assets_local(self, template: dict) -> None:
-        tid = template["id"]
         files = template.get("files", {})
-        keys = self._keys(tid)
-        new_etag = self._template_etag(template)
 
         html_path = os.path.join(
             self.base_path, template.get("path"), files.get("html", "template.html")
@@ -135,22 +164,16 @@ def _fetch_and_cache_assets_local(self, template: dict) -> None:
         logic_content = open(logic_path).read()
         test_content = open(test_path).read()
 
-        self.r.set(keys["meta"], json.dumps(template))
-        self.r.set(keys["html"], html_content)
-        self.r.set(keys["logic"], logic_content)
-        self.r.set(keys["test"], test_content)
-        self.r.set(keys["etag"], new_etag)
+        self._store_assets(template, html_content, logic_content, test_content)
 
     def _fetch_and_cache_assets(self, template: dict, force: bool = False) -> None:
         tid = template["id"]
         files = template.get("files", {})
         keys = self._keys(tid)
-        new_etag = self._template_etag(template)
-        old_etag = self.r.get(keys["etag"])
 
         if (
             not force
-            and old_etag == new_etag
+            and self.r.get(keys["source"]) == self._template_etag(template)
             and all(self.r.exists(keys[k]) for k in ("html", "logic", "test"))
         ):
             logger.debug("Template %s assets unchanged", tid)
@@ -167,12 +190,7 @@ def _fetch_and_cache_assets(self, template: dict, force: bool = False) -> None:
         test_resp = httpx.get(test_url, headers=self._text_headers(), timeout=30)
         test_resp.raise_for_status()
 
-        self.r.set(keys["meta"], json.dumps(template))
-        self.r.set(keys["html"], html_resp.text)
-        self.r.set(keys["logic"], logic_resp.text)
-        self.r.set(keys["test"], test_resp.text)
-        self.r.set(keys["etag"], new_etag)
-
+        new_etag = self._store_assets(template, html_resp.text, logic_resp.text, test_resp.text)
         logger.info("Cached assets for template %s (etag=%s)", tid, new_etag[:12])
 
     def sync_all_assets(self, force: bool = False) -> int:
@@ -194,7 +212,14 @@ def get_cached_assets(self, template_id: str) -> dict | None:
         test = self.r.get(keys["test"])
         if not (meta and html and logic and test):
             return None
-        return {"meta": json.loads(meta), "html": html, "logic": logic, "test": test}
+        etag = self.r.get(keys["etag"]) or ""
+        return {
+            "meta": json.loads(meta),
+            "html": html,
+            "logic": logic,
+            "test": test,
+            "etag": etag,
+        }
 
 
 registry = TemplateRegistry()
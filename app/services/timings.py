@@ -0,0 +1,168 @@
+"""Per-stage timing rows (``report_timings``) for the report pipeline."""
+
+from __future__ import annotations
+
+import logging
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from datetime import UTC, datetime, timedelta
+from typing import Any
+
+from sqlalchemy import case, func, insert
+
+from ..core import metrics, tracing
+from ..core.config import settings
+from ..db.postgres import SessionLocal
+from ..models import ReportTiming
+from . import query_log
+from .exceptions import TemporarilyUnavailableError
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (0.5, 0.95, 0.99)
+
+
+def queue_wait_ms(request) -> float | None:
+    """Milliseconds the task message waited before a worker picked it up."""
+    enqueued_at = getattr(request, "enqueued_at", None) if request is not None else None
+    if not enqueued_at:
+        return None
+    ready_at = float(enqueued_at)
+    eta = getattr(request, "eta", None)
+    if eta:
+        # Countdowns (parking, retries) are scheduled delay, not queueing.
+        try:
+            ready_at = max(ready_at, datetime.fromisoformat(eta).timestamp())
+        except (TypeError, ValueError):
+            pass
+    return max((time.time() - ready_at) * 1000, 0.0)
+
+
+def record(rows: list[dict[str, Any]]) -> None:
+    if not rows:
+        return
+    db = SessionLocal()
+    try:
+        db.execute(insert(ReportTiming), rows)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning("Failed to record stage timings: %s", e)
+    finally:
+        db.close()
+
+
+@contextmanager
+def stage_timer(
+    report_ids: str | list[str], template_id: str, stage: str, request=None
+) -> Iterator[dict[str, Any]]:
+    """Time the enclosed stage and record it for each of ``report_ids``.
+
+    Yields a dict the caller may set ``payload_bytes`` on. ``request`` is the Celery task
+    request when the stage starts a task, which enables the queue-wait measurement. Queries
+    the stage runs are logged through ``query_log``. Attempts that end in a
+    ``TemporarilyUnavailableError`` are re-queued, not finished, so they record no row; only
+    completed stages are observed in ``nava_stage_duration_seconds``.
+    """
+    timing: dict[str, Any] = {"payload_bytes": None}
+    wait = queue_wait_ms(request)
+    started_at = datetime.now(UTC)
+    t0 = time.perf_counter()
+    ok = False
+    parked = False
+    try:
+        with (
+            query_log.collect(report_ids, template_id, stage),
+            tracing.span(
+                stage, template_id=template_id, report_id=report_ids, queue_wait_ms=wait
+            ) as span,
+        ):
+            yield timing
+            if span is not None:
+                span.set_attribute("payload_bytes", timing["payload_bytes"])
+        ok = True
+    except TemporarilyUnavailableError:
+        parked = True
+        raise
+    finally:
+        duration_ms = (time.perf_counter() - t0) * 1000
+        if ok:
+            metrics.stage_duration.labels(template_id, stage).observe(duration_ms / 1000)
+        if settings.REPORT_TIMINGS and not parked:
+            finished_at = datetime.now(UTC)
+            ids = report_ids if isinstance(report_ids, list) else [report_ids]
+            record(
+                [
+                    {
+                        "report_id": report_id,
+                        "template_id": template_id,
+                        "stage": stage,
+                        "started_at": started_at,
+                        "finished_at": finished_at,
+                        "duration_ms": duration_ms,
+                        "queue_wait_ms": wait,
+                        "payload_bytes": timing["payload_bytes"],
+                        "ok": ok,
+                    }
+                    for report_id in ids
+                ]
+            )
+
+
+def percentiles(
+    db, since: datetime, template_id: str | None = None, stage: str | None = None
+) -> list[dict[str, Any]]:
+    """p50/p95/p99 of duration and queue wait per template and stage since ``since``.
+
+    Durations only count stages that completed; failed ones are reported in ``failed``.
+    """
+
+    def pct(col):
+        return [func.percentile_cont(p).within_group(col) for p in PERCENTILES]
+
+    # percentile_cont skips NULLs, so failed rows drop out of the duration percentiles.
+    ok_duration = case((ReportTiming.ok.is_(True), ReportTiming.duration_ms))
+
+    q = db.query(
+        ReportTiming.template_id,
+        ReportTiming.stage,
+        func.count(),
+        func.count().filter(ReportTiming.ok.is_(False)),
+        *pct(ok_duration),
+        *pct(ReportTiming.queue_wait_ms),
+        func.avg(ReportTiming.payload_bytes),
+    ).filter(ReportTiming.started_at >= since)
+    if template_id:
+        q = q.filter(ReportTiming.template_id == template_id)
+    if stage:
+        q = q.filter(ReportTiming.stage == stage)
+    rows = q.group_by(ReportTiming.template_id, ReportTiming.stage).all()
+
+    out = []
+    for row in rows:
+        tid, stage_name, count, failed = row[:4]
+        duration, wait = row[4:7], row[7:10]
+        out.append(
+            {
+                "template_id": tid,
+                "stage": stage_name,
+                "count": count,
+                "failed": int(failed or 0),
+                "duration_ms": dict(zip(("p50", "p95", "p99"), duration, strict=True)),
+                "queue_wait_ms": dict(zip(("p50", "p95", "p99"), wait, strict=True)),
+                "avg_payload_bytes": float(row[10]) if row[10] is not None else None,
+            }
+        )
+    return sorted(out, key=lambda r: (r["template_id"], r["stage"]))
+
+
+def purge(older_than_days: int) -> int:
+    db = SessionLocal()
+    try:
+        cutoff = datetime.now(UTC) - timedelta(days=older_than_days)
+        n = db.query(ReportTiming).filter(ReportTiming.started_at < cutoff).delete()
+        db.commit()
+        return n
+    finally:
+        db.close()
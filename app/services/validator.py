@@ -11,12 +11,14 @@ class ValidationError(ValueError):
 
 
 class Validator:
-    def __init__(self, template_id: str, args: dict[str, Any] | None):
+    def __init__(self, template_id: str, args: dict[str, Any] | None, template: dict | None = None):
         self.template_id = template_id
         self.args = args or {}
+        # Callers validating many requests pass the index entry to skip the per-call lookup.
+        self.template = template
 
     def validate(self) -> tuple[str, dict[str, Any]]:
-        tmpl = registry.get_template(self.template_id)
+        tmpl = self.template or registry.get_template(self.template_id)
         if not tmpl:
             registry.sync_index()
             tmpl = registry.get_template(self.template_id)
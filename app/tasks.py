@@ -1,58 +1,100 @@
 import json
 import logging
+import traceback as tb
 from datetime import UTC, datetime
 
-from .celery_app import celery_app
+from celery import group
+from celery.exceptions import Retry
+
+from .celery_app import broker_priority, celery_app
+from .core import metrics
+from .core.config import settings
 from .db.postgres import SessionLocal
 from .models import Report, ReportStatus
-from .services import aggregator
+from .services import aggregator, coalescing, profiling, query_log, timings
+from .services.exceptions import (
+    ConcurrencyLimitError,
+    DeadlineExceededError,
+    TemporarilyUnavailableError,
+)
+from .services.payload_store import encoded_size, payload_store
 from .services.templates_repo import registry
+from .services.timings import stage_timer
 from .services.validator import ValidationError, Validator
 
 logger = logging.getLogger(__name__)
 
+PIPELINE_MODES = ("chained", "fused")
+DEADLINE_POLICIES = ("drop", "downgrade", "ignore")
 
-@celery_app.task(bind=True, name="app.tasks.validate_report")
-def validate_report(self, template_id: str, args: dict, report_id: str):
-    logger.debug(
-        "[task=%s] validate_report report_id=%s template_id=%s",
-        self.request.id,
-        report_id,
-        template_id,
-    )
+
+# -- stage bodies, shared by the chained tasks and the fused pipeline task ---------------------
+
+
+def _validate(
+    template_id: str,
+    args: dict,
+    report_id: str,
+    deadline: str | None = None,
+    template: dict | None = None,
+) -> dict:
     try:
-        _, process_args = Validator(template_id, args).validate()
+        _, process_args = Validator(template_id, args, template=template).validate()
     except ValidationError as err:
         raise err
-    return {
+    data = {
         "template_id": template_id,
         "report_id": report_id,
         "process_args": process_args,
     }
+    if deadline:
+        data["deadline"] = deadline
+    return data
 
 
-@celery_app.task(bind=True, name="app.tasks.fetch_placeholders")
-def fetch_placeholders(self, data: dict):
-    logger.debug(
-        "[task=%s] fetch_placeholders report_id=%s", self.request.id, data.get("report_id")
-    )
-    placeholders = aggregator.fetch_placeholders(data["template_id"], data["process_args"])
-    data["placeholders"] = placeholders
+def _stash(data: dict, name: str, value, measure: bool = True) -> tuple:
+    """Return ``value`` or its claim-check ref, and its size in bytes if ``measure`` is set.
+
+    Stored payloads report the size of the stored blob; others are measured as JSON.
+    """
+    # Only chained runs hand data to the broker; fused runs keep it in memory.
+    if data.get("claim_check"):
+        return payload_store.offload(data["report_id"], name, value)
+    return value, encoded_size(value) if measure else None
+
+
+def _fetch_placeholders(data: dict, request=None) -> dict:
+    with stage_timer(
+        data["report_id"], data["template_id"], "fetch_placeholders", request
+    ) as timing:
+        # Profiled runs skip the caches so the profile shows the real data fetch.
+        profiled = profiling.claim(data["report_id"], data["template_id"])
+        with profiling.profile(data["report_id"], "fetch_placeholders", profiled):
+            placeholders = aggregator.fetch_placeholders(
+                data["template_id"], data["process_args"], use_cache=not profiled
+            )
+        data["placeholders"], timing["payload_bytes"] = _stash(data, "placeholders", placeholders)
     return data
 
 
-@celery_app.task(bind=True, name="app.tasks.generate_html")
-def generate_html(self, data: dict):
-    logger.debug("[task=%s] generate_html report_id=%s", self.request.id, data.get("report_id"))
-    html, kwargs = aggregator.render_html(data["template_id"], data["placeholders"])
-    data["html"] = html
-    data["pdf_kwargs"] = kwargs
+def _generate_html(data: dict, request=None) -> dict:
+    with stage_timer(data["report_id"], data["template_id"], "generate_html", request) as timing:
+        placeholders = payload_store.resolve(data["placeholders"])
+        with profiling.profile(
+            data["report_id"], "generate_html", profiling.armed(data["report_id"])
+        ):
+            html, kwargs = aggregator.render_html(data["template_id"], placeholders)
+        data["html"], timing["payload_bytes"] = _stash(data, "html", html)
+        data["pdf_kwargs"] = kwargs
     return data
 
 
-@celery_app.task(bind=True, name="app.tasks.generate_pdf")
-def generate_pdf(self, data: dict):
-    logger.debug("[task=%s] generate_pdf report_id=%s", self.request.id, data.get("report_id"))
+def _generate_pdf(data: dict, request=None) -> dict:
+    with stage_timer(data["report_id"], data["template_id"], "generate_pdf", request) as timing:
+        return _render_and_store_pdf(data, timing)
+
+
+def _render_and_store_pdf(data: dict, timing: dict) -> dict:
     report_id = data["report_id"]
     db = SessionLocal()
     try:
@@ -62,7 +104,9 @@ def generate_pdf(self, data: dict):
 
         _suffix = r.hash_id.hex[:8]
         filename = f"report_{r.template_id}_{_suffix}"
-        aggregator.render_pdf(filename, data["html"], data["pdf_kwargs"])
+        html = payload_store.resolve(data["html"])
+        timing["payload_bytes"] = encoded_size(html)
+        aggregator.render_pdf(filename, html, data["pdf_kwargs"])
         r.output_file = filename
         r.updated_at = datetime.now(UTC)
         db.add(r)
@@ -72,11 +116,13 @@ def generate_pdf(self, data: dict):
         db.close()
 
 
-@celery_app.task(bind=True, name="app.tasks.update_report_status")
-def update_report_status(self, data: dict):
-    logger.debug(
-        "[task=%s] update_report_status report_id=%s", self.request.id, data.get("report_id")
-    )
+def _update_report_status(data: dict, request=None) -> None:
+    with stage_timer(data["report_id"], data["template_id"], "update_report_status", request):
+        _store_generated(data)
+    coalescing.finish(data["report_id"], ok=True)
+
+
+def _store_generated(data: dict) -> None:
     report_id = data["report_id"]
     db = SessionLocal()
     try:
@@ -84,30 +130,27 @@ def update_report_status(self, data: dict):
         if not r:
             return
         r.status = ReportStatus.GENERATED
-        r.output_content = data.get("html", "")
+        r.output_content = payload_store.resolve(data.get("html", ""))
         r.updated_at = datetime.now(UTC)
         db.add(r)
         db.commit()
         logger.info("Report %s marked GENERATED", report_id)
     finally:
         db.close()
+        payload_store.delete_report(report_id)
 
 
-@celery_app.task(bind=True, name="app.tasks.handle_errors")
-def handle_errors(
-    self, request=None, exc=None, traceback=None, stage=None, report_id=None, **kwargs
-):
+def _mark_failed(report_id, stage, exc, traceback) -> None:
     logger.error("Error in %s for report %s: %s", stage, report_id, exc)
+    metrics.stage_failures.labels(stage or "unknown", type(exc).__name__).inc()
     message = "Unexpected error during report generation. Contact admin."
     error_body = {
         "verbose_message": f"{stage} - {exc} - {traceback}",
         "message": message,
     }
 
-    from datetime import UTC, datetime
-
-    from .db.postgres import SessionLocal
-    from .models import Report, ReportStatus
+    if isinstance(exc, DeadlineExceededError):
+        error_body["message"] = "The report deadline passed before it could be generated."
 
     db = SessionLocal()
     try:
@@ -120,17 +163,136 @@ def handle_errors(
             db.commit()
     finally:
         db.close()
+        payload_store.delete_report(report_id)
+        coalescing.finish(report_id, ok=False)
 
 
-def generate_report_async(template_id: str, args: dict, report_id: str):
-    sig = (
-        validate_report.s(template_id, args, report_id).set(
-            link_error=handle_errors.s(stage="validate_report", report_id=report_id)
-        )
-        | fetch_placeholders.s().set(
-            link_error=handle_errors.s(stage="fetch_placeholders", report_id=report_id)
-        )
-        | generate_html.s().set(
+def _park_kind(err: TemporarilyUnavailableError) -> str:
+    return "concurrency" if isinstance(err, ConcurrencyLimitError) else "unavailable"
+
+
+def _park_limit(err: TemporarilyUnavailableError) -> int:
+    if isinstance(err, ConcurrencyLimitError):
+        return settings.CONCURRENCY_MAX_RETRIES
+    return settings.REPORT_PARK_MAX_RETRIES
+
+
+def _can_park(err: TemporarilyUnavailableError, parks: dict | None) -> bool:
+    return (parks or {}).get(_park_kind(err), 0) < _park_limit(err)
+
+
+def _park(task, report_id, err: TemporarilyUnavailableError, parks: dict | None):
+    """Re-queue ``task`` while a data source is unavailable instead of failing the report.
+
+    ``parks`` counts earlier parks per kind and travels in the task's kwargs, so concurrency
+    throttling and outages each have their own budget rather than sharing ``request.retries``.
+    """
+    if not _can_park(err, parks):
+        raise err
+    kind = _park_kind(err)
+    parks = {**(parks or {}), kind: (parks or {}).get(kind, 0) + 1}
+    log = logger.info if kind == "concurrency" else logger.warning
+    log("Parking report_id=%s for %.0fs: %s", report_id, err.retry_after, err)
+    raise task.retry(
+        kwargs={**(task.request.kwargs or {}), "parks": parks},
+        exc=err,
+        countdown=err.retry_after,
+        max_retries=task.request.retries + 1,
+    ) from err
+
+
+def _check_deadline(task, report_id, deadline: str | None, stage: str, requeue: bool = True):
+    """Apply ``REPORT_DEADLINE_POLICY`` when ``stage`` starts after the report's deadline.
+
+    ``drop`` fails the report; ``downgrade`` re-queues the task once at the lowest priority so
+    it (and, through priority inheritance, the rest of the chain) yields to on-time work.
+    """
+    if not deadline or datetime.fromisoformat(deadline) > datetime.now(UTC):
+        return
+    policy = settings.REPORT_DEADLINE_POLICY
+    if policy not in DEADLINE_POLICIES:
+        logger.warning("Unknown deadline policy %r; using drop", policy)
+        policy = "drop"
+    if policy == "drop":
+        raise DeadlineExceededError(f"Deadline {deadline} passed before {stage}")
+    if policy == "downgrade" and requeue and not task.request.called_directly:
+        lowest = broker_priority(0)
+        if (task.request.delivery_info or {}).get("priority") != lowest:
+            logger.info(
+                "Downgrading report_id=%s at %s: deadline %s passed", report_id, stage, deadline
+            )
+            raise task.retry(countdown=0, priority=lowest, max_retries=task.request.retries + 1)
+
+
+# -- chained mode: one task per stage ----------------------------------------------------------
+
+
+@celery_app.task(bind=True, name="app.tasks.validate_report")
+def validate_report(
+    self, template_id: str, args: dict, report_id: str, deadline: str | None = None
+):
+    logger.debug(
+        "[task=%s] validate_report report_id=%s template_id=%s",
+        self.request.id,
+        report_id,
+        template_id,
+    )
+    _check_deadline(self, report_id, deadline, "validate_report")
+    with stage_timer(report_id, template_id, "validate_report", self.request):
+        data = _validate(template_id, args, report_id, deadline)
+    data["claim_check"] = payload_store.enabled
+    return data
+
+
+@celery_app.task(bind=True, name="app.tasks.fetch_placeholders")
+def fetch_placeholders(self, data: dict, parks: dict | None = None):
+    logger.debug(
+        "[task=%s] fetch_placeholders report_id=%s", self.request.id, data.get("report_id")
+    )
+    _check_deadline(self, data.get("report_id"), data.get("deadline"), "fetch_placeholders")
+    try:
+        return _fetch_placeholders(data, self.request)
+    except TemporarilyUnavailableError as err:
+        _park(self, data.get("report_id"), err, parks)
+
+
+@celery_app.task(bind=True, name="app.tasks.generate_html")
+def generate_html(self, data: dict):
+    logger.debug("[task=%s] generate_html report_id=%s", self.request.id, data.get("report_id"))
+    _check_deadline(self, data.get("report_id"), data.get("deadline"), "generate_html")
+    return _generate_html(data, self.request)
+
+
+@celery_app.task(bind=True, name="app.tasks.generate_pdf")
+def generate_pdf(self, data: dict):
+    logger.debug("[task=%s] generate_pdf report_id=%s", self.request.id, data.get("report_id"))
+    _check_deadline(self, data.get("report_id"), data.get("deadline"), "generate_pdf")
+    return _generate_pdf(data, self.request)
+
+
+@celery_app.task(bind=True, name="app.tasks.update_report_status")
+def update_report_status(self, data: dict):
+    logger.debug(
+        "[task=%s] update_report_status report_id=%s", self.request.id, data.get("report_id")
+    )
+    _update_report_status(data, self.request)
+
+
+@celery_app.task(bind=True, name="app.tasks.handle_errors")
+def handle_errors(
+    self, request=None, exc=None, traceback=None, stage=None, report_id=None, **kwargs
+):
+    _mark_failed(report_id, stage, exc, traceback)
+
+
+# -- batched fetch: one data fetch for many reports of a template, then per-report chains -----
+
+
+def _render_chain(report_id: str, data: dict | None = None):
+    """The render → pdf → status tail of a report chain, optionally bound to ``data``."""
+    args = () if data is None else (data,)
+    return (
+        generate_html.s(*args).set(
             link_error=handle_errors.s(stage="generate_html", report_id=report_id)
         )
         | generate_pdf.s().set(
@@ -140,11 +302,273 @@ def generate_report_async(template_id: str, args: dict, report_id: str):
             link_error=handle_errors.s(stage="update_report_status", report_id=report_id)
         )
     )
-    res = sig.apply_async()
-    logger.info("Enqueued report pipeline report_id=%s celery_root_task_id=%s", report_id, res.id)
+
+
+@celery_app.task(bind=True, name="app.tasks.fetch_placeholders_batch")
+def fetch_placeholders_batch(self, template_id: str, items: list[dict], parks: dict | None = None):
+    """Validate and fetch placeholders for many reports of one template, then fan out.
+
+    ``items`` are ``{"report_id", "args", "deadline"}`` dicts. Data is fetched once through
+    ``aggregator.fetch_placeholders_batch``; every report that succeeds continues as its own
+    render → pdf → status chain, and failures are recorded per report.
+    """
+    logger.debug(
+        "[task=%s] fetch_placeholders_batch template_id=%s reports=%s",
+        self.request.id,
+        template_id,
+        len(items),
+    )
+    # Reports not yet failed or handed to their own chain; any escaping error fails them all,
+    # since this task has no ``link_error`` to do it.
+    pending = {item["report_id"]: None for item in items}
+    stage = "validate_report"
+    signatures = []
+    try:
+        tmpl = registry.get_template(template_id)
+        batch = []
+        for item in items:
+            report_id = item["report_id"]
+            try:
+                _check_deadline(
+                    self, report_id, item.get("deadline"), "fetch_placeholders", requeue=False
+                )
+                data = _validate(template_id, item["args"], report_id, item.get("deadline"), tmpl)
+            except Exception as err:
+                _mark_failed(report_id, stage, err, tb.format_exc())
+                pending.pop(report_id, None)
+                continue
+            data["claim_check"] = payload_store.enabled
+            batch.append(data)
+        if not batch:
+            return
+
+        stage = "fetch_placeholders"
+        profiled = [
+            data["report_id"] for data in batch if profiling.claim(data["report_id"], template_id)
+        ]
+        try:
+            with (
+                stage_timer(
+                    [data["report_id"] for data in batch],
+                    template_id,
+                    stage,
+                    self.request,
+                ),
+                profiling.profile(profiled, stage, bool(profiled)),
+            ):
+                results = aggregator.fetch_placeholders_batch(
+                    template_id, [data["process_args"] for data in batch], use_cache=not profiled
+                )
+        except TemporarilyUnavailableError as err:
+            if _can_park(err, parks):
+                _park(self, f"batch:{template_id}", err, parks)
+            raise
+
+        priority = (self.request.delivery_info or {}).get("priority")
+        options = {} if priority is None else {"priority": priority}
+        for data, result in zip(batch, results, strict=True):
+            if isinstance(result, Exception):
+                trace = "".join(tb.format_exception(result))
+                _mark_failed(data["report_id"], stage, result, trace)
+                pending.pop(data["report_id"], None)
+                continue
+            data["placeholders"], _ = _stash(data, "placeholders", result, measure=False)
+            signatures.append(_render_chain(data["report_id"], data).set(**options))
+        if signatures:
+            group(signatures).apply_async()
+        pending.clear()
+    except Retry:
+        raise
+    except Exception as err:
+        trace = tb.format_exc()
+        for report_id in pending:
+            _mark_failed(report_id, stage, err, trace)
+        raise
+    logger.info(
+        "Fetched %s/%s reports of %s in one batch", len(signatures), len(items), template_id
+    )
+
+
+# -- fused mode: all stages in one task --------------------------------------------------------
+
+
+@celery_app.task(bind=True, name="app.tasks.run_report_pipeline")
+def run_report_pipeline(
+    self,
+    template_id: str,
+    args: dict,
+    report_id: str,
+    deadline: str | None = None,
+    parks: dict | None = None,
+):
+    """Run validate → fetch → render → pdf → status in-process.
+
+    Skips the broker and result-backend round trips between stages; failures are still
+    attributed to the stage that raised, exactly as ``handle_errors`` does in chained mode.
+    """
+    logger.debug(
+        "[task=%s] run_report_pipeline report_id=%s template_id=%s",
+        self.request.id,
+        report_id,
+        template_id,
+    )
+    stage = "validate_report"
+    try:
+        # Once work has started, re-queueing would repeat it, so only the first check may downgrade.
+        _check_deadline(self, report_id, deadline, stage)
+        with stage_timer(report_id, template_id, stage, self.request):
+            data = _validate(template_id, args, report_id, deadline)
+        stage = "fetch_placeholders"
+        _check_deadline(self, report_id, deadline, stage, requeue=False)
+        data = _fetch_placeholders(data)
+        stage = "generate_html"
+        _check_deadline(self, report_id, deadline, stage, requeue=False)
+        data = _generate_html(data)
+        stage = "generate_pdf"
+        _check_deadline(self, report_id, deadline, stage, requeue=False)
+        data = _generate_pdf(data)
+        stage = "update_report_status"
+        _update_report_status(data)
+    except Retry:
+        raise
+    except TemporarilyUnavailableError as err:
+        if _can_park(err, parks):
+            _park(self, report_id, err, parks)
+        _mark_failed(report_id, stage, err, tb.format_exc())
+        raise
+    except Exception as err:
+        _mark_failed(report_id, stage, err, tb.format_exc())
+        raise
+
+
+def _pipeline_mode(template_id: str, template: dict | None = None) -> str:
+    mode = settings.REPORT_PIPELINE_MODE
+    try:
+        tmpl = template or registry.get_template(template_id) or {}
+        mode = tmpl.get("pipeline") or mode
+    except Exception as e:
+        logger.warning("Could not read pipeline mode for %s: %s", template_id, e)
+    if mode not in PIPELINE_MODES:
+        logger.warning("Unknown pipeline mode %r for %s; using chained", mode, template_id)
+        mode = "chained"
+    return mode
+
+
+def report_signature(
+    template_id: str,
+    args: dict,
+    report_id: str,
+    priority: int | None = None,
+    deadline: datetime | None = None,
+    template: dict | None = None,
+):
+    """Build the (unsent) Celery signature that generates one report."""
+    if priority is None:
+        priority = settings.REPORT_DEFAULT_PRIORITY
+    options = {"priority": broker_priority(priority)}
+    deadline_iso = deadline.isoformat() if deadline else None
+
+    if _pipeline_mode(template_id, template) == "fused":
+        return run_report_pipeline.signature(
+            (template_id, args, report_id), {"deadline": deadline_iso}, **options
+        )
+
+    sig = (
+        validate_report.s(template_id, args, report_id, deadline=deadline_iso).set(
+            link_error=handle_errors.s(stage="validate_report", report_id=report_id)
+        )
+        | fetch_placeholders.s().set(
+            link_error=handle_errors.s(stage="fetch_placeholders", report_id=report_id)
+        )
+        | _render_chain(report_id)
+    )
+    return sig.set(**options)
+
+
+def report_signatures(entries: list[dict]) -> list:
+    """Build signatures for many reports, fetching same-template reports together if enabled.
+
+    ``entries`` hold ``report_signature`` keyword arguments. Chained templates that set
+    ``batch_size`` in map.json get one ``fetch_placeholders_batch`` task per ``batch_size``
+    reports (sent at the highest priority in the chunk); all others get a chain each.
+    """
+    signatures, batched = [], {}
+    for entry in entries:
+        tmpl = entry.get("template") or {}
+        size = int(tmpl.get("batch_size") or 0)
+        if size > 1 and _pipeline_mode(entry["template_id"], tmpl) == "chained":
+            batched.setdefault(entry["template_id"], (size, []))[1].append(entry)
+        else:
+            signatures.append(report_signature(**entry))
+
+    for template_id, (size, group_entries) in batched.items():
+        for start in range(0, len(group_entries), size):
+            chunk = group_entries[start : start + size]
+            priority = max(
+                settings.REPORT_DEFAULT_PRIORITY if e.get("priority") is None else e["priority"]
+                for e in chunk
+            )
+            items = [
+                {
+                    "report_id": e["report_id"],
+                    "args": e["args"],
+                    "deadline": e["deadline"].isoformat() if e.get("deadline") else None,
+                }
+                for e in chunk
+            ]
+            signatures.append(
+                fetch_placeholders_batch.signature(
+                    (template_id, items), priority=broker_priority(priority)
+                )
+            )
+    return signatures
+
+
+def generate_report_async(
+    template_id: str,
+    args: dict,
+    report_id: str,
+    priority: int | None = None,
+    deadline: datetime | None = None,
+):
+    res = report_signature(template_id, args, report_id, priority, deadline).apply_async()
+    logger.info(
+        "Enqueued report pipeline report_id=%s priority=%s celery_root_task_id=%s",
+        report_id,
+        settings.REPORT_DEFAULT_PRIORITY if priority is None else priority,
+        res.id,
+    )
     return res
 
 
+def generate_reports_async(signatures: list):
+    """Send many ``report_signature`` results as one Celery group over a single connection."""
+    res = group(signatures).apply_async()
+    logger.info("Enqueued %s report pipelines group_id=%s", len(signatures), res.id)
+    return res
+
+
+@celery_app.task(name="app.tasks.purge_payloads")
+def purge_payloads():
+    n = payload_store.purge_expired()
+    if n:
+        logger.info("Purged %s expired payload directories", n)
+
+
+@celery_app.task(name="app.tasks.purge_report_timings")
+def purge_report_timings():
+    n = timings.purge(settings.REPORT_TIMINGS_RETENTION_DAYS)
+    if n:
+        logger.info("Purged %s report timing rows", n)
+
+
+@celery_app.task(name="app.tasks.purge_report_queries")
+def purge_report_queries():
+    n = query_log.purge(settings.REPORT_QUERY_LOG_RETENTION_DAYS)
+    if n:
+        logger.info("Purged %s report query rows", n)
+
+
 @celery_app.task(name="app.tasks.sync_templates_index")
 def sync_templates_index():
     try:
@@ -0,0 +1,566 @@
+"""End-to-end load test of the report pipeline against local stand-ins.
+
+Synthetic reports are submitted through the API (FastAPI ``TestClient``) and run through the
+real ``Validator``, ``aggregator`` and Celery tasks, with:
+
+* a SQLite data source (``kind: sqlite``) in place of MSSQL, seeded with ``--rows`` rows per
+  client for a generated template (``logic.py``, ``test.py``, ``template.html``);
+* SQLite (default) or the configured Postgres as the app database;
+* an in-process HTTP fake of the generator's ``/generate-pdf`` (``--generator-ms`` latency);
+* an in-process Redis (``fakeredis``) or a local one (``--redis redis://localhost:6379/15``);
+* eager Celery (default), or ``--celery worker`` to send to workers on a local Redis broker.
+
+It reports throughput, end-to-end and per-stage latency percentiles (from ``report_timings``)
+and peak RSS. ``--output`` stores the results as JSON; ``--compare`` diffs against a stored run.
+
+Usage::
+
+    python -m benchmarks.pipeline [--reports 200] [--rows 500] [--mode chained|fused]
+        [--concurrency 1] [--batch 0] [--output run.json] [--compare baseline.json]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import UTC, date, datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+TEMPLATE_ID = "bench_positions"
+SOURCE = "bench"
+STAGES = (
+    "validate_report",
+    "fetch_placeholders",
+    "generate_html",
+    "generate_pdf",
+    "update_report_status",
+)
+
+LOGIC_PY = """
+def main(args, db):
+    df = db.read_sql("SELECT * FROM positions WHERE client_id = ?", (args["client_id"],))
+    return {
+        "client_id": args["client_id"],
+        "as_of": args["as_of"],
+        "positions": df.to_dict("records"),
+        "total": float(df["market_value"].sum()),
+    }
+
+
+def main_batch(args_list, db):
+    ids = sorted({a["client_id"] for a in args_list})
+    marks = ",".join("?" * len(ids))
+    df = db.read_sql(f"SELECT * FROM positions WHERE client_id IN ({marks})", tuple(ids))
+    groups = {k: g for k, g in df.groupby("client_id")}
+    out = []
+    for a in args_list:
+        g = groups[a["client_id"]]
+        out.append(
+            {
+                "client_id": a["client_id"],
+                "as_of": a["as_of"],
+                "positions": g.to_dict("records"),
+                "total": float(g["market_value"].sum()),
+            }
+        )
+    return out
+"""
+
+TEST_PY = """
+def main(args, db):
+    return db.is_record_exist(
+        "SELECT 1 FROM positions WHERE client_id = ? LIMIT 1", (args["client_id"],)
+    )
+"""
+
+TEMPLATE_HTML = """<html><body>
+<h1>Positions of client {{ client_id }} as of {{ as_of }}</h1>
+<table>
+<tr><th>Date</th><th>Instrument</th><th>Qty</th><th>Price</th><th>Value</th><th>Ccy</th></tr>
+{% for p in positions %}<tr><td>{{ p.trade_date }}</td><td>{{ p.instrument }}</td>
+<td>{{ p.quantity }}</td><td>{{ "%.4f"|format(p.price) }}</td>
+<td>{{ "{:,.2f}".format(p.market_value) }}</td><td>{{ p.currency }}</td></tr>
+{% endfor %}</table>
+<p>Total: {{ "{:,.2f}".format(total) }}</p>
+<p>Generated at {{ generated_at }}</p>
+</body></html>
+"""
+
+
+# -- fixtures ----------------------------------------------------------------------------------
+
+
+def seed_source(path: str, clients: int, rows: int) -> None:
+    rnd = random.Random(42)
+    start = date(2024, 1, 1)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute("DROP TABLE IF EXISTS positions")
+        conn.execute(
+            "CREATE TABLE positions (client_id INTEGER, trade_date TEXT, instrument TEXT,"
+            " quantity INTEGER, price REAL, market_value REAL, currency TEXT)"
+        )
+        conn.executemany(
+            "INSERT INTO positions VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                (
+                    client,
+                    (start + timedelta(days=i % 365)).isoformat(),
+                    f"ISIN{rnd.randrange(10**9):09d}",
+                    rnd.randrange(1, 10_000),
+                    rnd.uniform(1, 500),
+                    rnd.uniform(1e3, 1e7),
+                    rnd.choice(["USD", "EUR", "CHF", "GBP"]),
+                )
+                for client in range(clients)
+                for i in range(rows)
+            ),
+        )
+        conn.execute("CREATE INDEX ix_positions_client ON positions (client_id)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def write_templates(directory: str, mode: str, fetch_batch_size: int) -> None:
+    path = os.path.join(directory, TEMPLATE_ID)
+    os.makedirs(path, exist_ok=True)
+    for name, body in (
+        ("logic.py", LOGIC_PY),
+        ("test.py", TEST_PY),
+        ("template.html", TEMPLATE_HTML),
+    ):
+        with open(os.path.join(path, name), "w", encoding="utf-8") as fh:
+            fh.write(body.lstrip())
+    entry = {
+        "id": TEMPLATE_ID,
+        "path": TEMPLATE_ID,
+        "source": SOURCE,
+        "pipeline": mode,
+        "args": {"required": ["client_id", "as_of"], "optional": ["seq"]},
+    }
+    if fetch_batch_size > 1:
+        entry["batch_size"] = fetch_batch_size
+    with open(os.path.join(directory, "map.json"), "w", encoding="utf-8") as fh:
+        json.dump({"templates": [entry]}, fh, indent=2)
+
+
+class _GeneratorHandler(BaseHTTPRequestHandler):
+    latency = 0.0
+
+    def do_POST(self):  # noqa: N802 - BaseHTTPRequestHandler hook
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.latency:
+            time.sleep(self.latency)
+        body = b'{"message": "ok"}'
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_fake_generator(latency_ms: float) -> ThreadingHTTPServer:
+    """Serve ``/generate-pdf`` in-process; returns the server (``server_address`` is bound)."""
+    handler = type("Handler", (_GeneratorHandler,), {"latency": latency_ms / 1000})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, name="fake-generator", daemon=True).start()
+    return server
+
+
+def install_fake_redis() -> None:
+    """Back every ``redis.Redis.from_url`` client with one in-process fakeredis server."""
+    try:
+        import fakeredis
+    except ImportError:
+        sys.exit("--redis fake needs fakeredis (pip install fakeredis); or pass a redis:// URL")
+    import redis
+
+    server = fakeredis.FakeServer()
+    redis.Redis.from_url = staticmethod(lambda url, **kw: fakeredis.FakeRedis(server=server, **kw))
+
+
+def use_sqlite_app_db(path: str):
+    """Point the app's sessions at a SQLite file and create the schema.
+
+    Postgres ``UUID``/``JSONB`` columns become text UUIDs (the app binds ids as strings, which
+    only Postgres coerces) and generic JSON.
+    """
+    import uuid
+
+    from sqlalchemy import JSON, String, TypeDecorator, create_engine
+    from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+    from app.db import postgres
+
+    class TextUUID(TypeDecorator):
+        impl = String(36)
+        cache_ok = True
+
+        def process_bind_param(self, value, dialect):
+            return None if value is None else str(uuid.UUID(str(value)))
+
+        def process_result_value(self, value, dialect):
+            return None if value is None else uuid.UUID(value)
+
+    for table in postgres.Base.metadata.tables.values():
+        for column in table.columns:
+            if isinstance(column.type, UUID):
+                column.type = TextUUID()
+            elif isinstance(column.type, JSONB):
+                column.type = JSON()
+
+    engine = create_engine(
+        f"sqlite:///{path}", connect_args={"check_same_thread": False, "timeout": 30}
+    )
+    postgres.SessionLocal.configure(bind=engine)
+    postgres.Base.metadata.create_all(engine)
+    return engine
+
+
+# -- measurements ------------------------------------------------------------------------------
+
+
+def percentiles(values: list[float]) -> dict[str, float | None]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    if len(values) == 1:
+        return {"p50": values[0], "p95": values[0], "p99": values[0]}
+    q = statistics.quantiles(values, n=100, method="inclusive")
+    return {"p50": round(q[49], 2), "p95": round(q[94], 2), "p99": round(q[98], 2)}
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes.
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def git_commit() -> str | None:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        )
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# -- run ---------------------------------------------------------------------------------------
+
+
+def _configure_env(args, workdir: str, source_path: str) -> None:
+    os.environ.setdefault("SECRET_KEY", "benchmark")
+    os.environ.update(
+        {
+            "LOG_LEVEL": args.log_level,
+            "LOAD_TEMPLATES_LOCAL": "true",
+            "DATA_SOURCES": json.dumps({SOURCE: {"kind": "sqlite", "dsn": source_path}}),
+            "REPORT_TIMINGS": "true",
+            "MEDIA_DIR": os.path.join(workdir, "files"),
+        }
+    )
+    if args.redis != "fake":
+        os.environ["REDIS_URL"] = args.redis
+
+
+def _submit(client, headers, args, offset: int, count: int) -> list[str]:
+    def item(i: int) -> dict:
+        return {
+            "template_id": TEMPLATE_ID,
+            # seq keeps every submission distinct, so none are coalesced or served from cache.
+            "input_args": {"client_id": i % args.clients, "as_of": "2024-12-31", "seq": i},
+        }
+
+    if args.batch:
+        hash_ids = []
+        for start in range(offset, offset + count, args.batch):
+            items = [item(i) for i in range(start, min(start + args.batch, offset + count))]
+            resp = client.post("/api/reports/batch", json={"items": items}, headers=headers)
+            resp.raise_for_status()
+            hash_ids.extend(r["hash_id"] for r in resp.json()["reports"])
+        return hash_ids
+
+    def one(i: int) -> str:
+        resp = client.post("/api/reports", json=item(i), headers=headers)
+        resp.raise_for_status()
+        return resp.json()["hash_id"]
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        return list(pool.map(one, range(offset, offset + count)))
+
+
+def _wait(session_factory, report_ids: list, timeout: float) -> None:
+    from app.models import Report, ReportStatus
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        db = session_factory()
+        try:
+            pending = (
+                db.query(Report)
+                .filter(Report.id.in_(report_ids), Report.status == ReportStatus.PENDING)
+                .count()
+            )
+        finally:
+            db.close()
+        if not pending:
+            return
+        time.sleep(0.5)
+    print(f"Timed out after {timeout:.0f}s with {pending} reports pending", file=sys.stderr)
+
+
+def run(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="nava-bench-")
+    os.makedirs(workdir, exist_ok=True)
+    source_path = os.path.join(workdir, "source.db")
+    templates_dir = os.path.join(workdir, "templates")
+    seed_source(source_path, args.clients, args.rows)
+    write_templates(templates_dir, args.mode, args.fetch_batch_size)
+    _configure_env(args, workdir, source_path)
+    if args.redis == "fake":
+        install_fake_redis()
+
+    from fastapi.testclient import TestClient
+    from sqlalchemy.orm import sessionmaker
+
+    from app.celery_app import celery_app
+    from app.core.config import settings
+    from app.core.security import create_access_token
+    from app.db.postgres import Base, SessionLocal, engine, get_db
+    from app.deps import get_db_dep
+    from app.main import app
+    from app.models import Report, ReportStatus, ReportTiming, User
+    from app.services.templates_repo import registry
+
+    if args.app_db == "sqlite":
+        engine = use_sqlite_app_db(os.path.join(workdir, "app.db"))
+    else:
+        Base.metadata.create_all(engine)
+
+    # Eager tasks run inside the request; give the API its own sessions so the tasks closing
+    # the thread's scoped session don't detach the request's objects, as with real workers.
+    api_sessions = sessionmaker(bind=engine, autoflush=False)
+
+    def api_db():
+        db = api_sessions()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    app.dependency_overrides[get_db] = api_db
+    app.dependency_overrides[get_db_dep] = api_db
+
+    if args.celery == "eager":
+        celery_app.conf.task_always_eager = True
+    else:
+        print(
+            "Sending to workers on the configured broker; start them with\n"
+            f"  DATA_SOURCES='{os.environ['DATA_SOURCES']}' REDIS_URL={args.redis}",
+            file=sys.stderr,
+        )
+
+    generator = start_fake_generator(args.generator_ms)
+    settings.GENERATOR_HOST = "{}:{}".format(*generator.server_address)
+    registry.base_path = templates_dir + os.sep
+    registry.sync_index()
+    registry.sync_all_assets(force=True)
+
+    db = SessionLocal()
+    email = "bench@example.com"
+    if not db.query(User).filter(User.email == email).first():
+        db.add(User(email=email, hashed_password="!", full_name="Benchmark"))
+        db.commit()
+    db.close()
+    headers = {"Authorization": f"Bearer {create_access_token(email)}"}
+
+    client = TestClient(app)
+    if args.warmup:
+        warm = _submit(client, headers, args, 0, args.warmup)
+        if args.celery == "worker":
+            _wait(SessionLocal, _ids(SessionLocal, warm), args.timeout)
+
+    t0 = time.perf_counter()
+    hash_ids = _submit(client, headers, args, args.warmup, args.reports)
+    submitted_s = time.perf_counter() - t0
+    report_ids = _ids(SessionLocal, hash_ids)
+    if args.celery == "worker":
+        _wait(SessionLocal, report_ids, args.timeout)
+    wall_s = time.perf_counter() - t0
+    generator.shutdown()
+
+    db = SessionLocal()
+    try:
+        reports = db.query(Report).filter(Report.id.in_(report_ids)).all()
+        timings = db.query(ReportTiming).filter(ReportTiming.report_id.in_(report_ids)).all()
+    finally:
+        db.close()
+
+    counts: dict[str, int] = {}
+    for r in reports:
+        counts[r.status.value] = counts.get(r.status.value, 0) + 1
+    generated = counts.get(ReportStatus.GENERATED.value, 0)
+    e2e = [
+        (r.updated_at - r.created_at).total_seconds() * 1000
+        for r in reports
+        if r.status == ReportStatus.GENERATED
+    ]
+    stages = {}
+    for stage in STAGES:
+        durations = [t.duration_ms for t in timings if t.stage == stage and t.ok]
+        waits = [t.queue_wait_ms for t in timings if t.stage == stage and t.queue_wait_ms]
+        if durations:
+            stages[stage] = {
+                "count": len(durations),
+                "duration_ms": percentiles(durations),
+                "queue_wait_ms": percentiles(waits),
+            }
+
+    return {
+        "benchmark": "pipeline",
+        "commit": git_commit(),
+        "timestamp": datetime.now(UTC).isoformat(),
+        "python": platform.python_version(),
+        "params": {
+            k: getattr(args, k)
+            for k in (
+                "reports",
+                "rows",
+                "clients",
+                "mode",
+                "concurrency",
+                "batch",
+                "fetch_batch_size",
+                "generator_ms",
+                "celery",
+                "app_db",
+            )
+        },
+        "submitted_s": round(submitted_s, 3),
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(generated / wall_s, 2) if wall_s else None,
+        "counts": counts,
+        "e2e_ms": percentiles(e2e),
+        "stages": stages,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _ids(session_factory, hash_ids: list[str]) -> list:
+    from app.models import Report
+
+    db = session_factory()
+    try:
+        rows = db.query(Report.id).filter(Report.hash_id.in_(hash_ids)).all()
+        return [r[0] for r in rows]
+    finally:
+        db.close()
+
+
+# -- output ------------------------------------------------------------------------------------
+
+
+def _fmt(value) -> str:
+    return "-" if value is None else f"{value:,.1f}"
+
+
+def print_results(res: dict) -> None:
+    p = res["params"]
+    print(
+        f"{res['counts']} of {p['reports']} reports ({p['mode']}, {p['rows']} rows each,"
+        f" celery={p['celery']}) in {res['wall_s']}s"
+    )
+    print(f"throughput   {res['throughput_rps']} reports/s")
+    e2e = res["e2e_ms"]
+    print(f"end-to-end   p50 {_fmt(e2e['p50'])}  p95 {_fmt(e2e['p95'])}  p99 {_fmt(e2e['p99'])} ms")
+    print(f"peak RSS     {res['peak_rss_mb']} MB\n")
+    print(f"{'stage':<22}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'wait p95':>10}")
+    for stage, s in res["stages"].items():
+        d = s["duration_ms"]
+        print(
+            f"{stage:<22}{s['count']:>7}{_fmt(d['p50']):>10}{_fmt(d['p95']):>10}"
+            f"{_fmt(d['p99']):>10}{_fmt(s['queue_wait_ms']['p95']):>10}"
+        )
+
+
+def _delta(new, old) -> str:
+    if new is None or not old:
+        return "-"
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def print_comparison(res: dict, base: dict) -> None:
+    print(f"\nvs {base.get('commit') or 'baseline'} ({base.get('timestamp', '?')})")
+    changed = {k: v for k, v in res["params"].items() if base.get("params", {}).get(k) != v}
+    if changed:
+        print(f"note: parameters differ from the baseline: {changed}")
+    print(f"{'metric':<36}{'baseline':>12}{'current':>12}{'change':>10}")
+    rows = [
+        ("throughput reports/s", base.get("throughput_rps"), res["throughput_rps"]),
+        ("end-to-end p95 ms", base["e2e_ms"]["p95"], res["e2e_ms"]["p95"]),
+        ("peak RSS MB", base.get("peak_rss_mb"), res["peak_rss_mb"]),
+    ]
+    for stage, s in res["stages"].items():
+        old = base.get("stages", {}).get(stage)
+        rows.append((f"{stage} p95 ms", old and old["duration_ms"]["p95"], s["duration_ms"]["p95"]))
+    for name, old, new in rows:
+        print(f"{name:<36}{_fmt(old):>12}{_fmt(new):>12}{_delta(new, old):>10}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reports", type=int, default=200, help="measured reports")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured reports run first")
+    parser.add_argument("--rows", type=int, default=500, help="rows fetched per report")
+    parser.add_argument("--clients", type=int, default=50, help="distinct clients in the source")
+    parser.add_argument("--mode", choices=("chained", "fused"), default="chained")
+    parser.add_argument("--concurrency", type=int, default=1, help="parallel API clients")
+    parser.add_argument("--batch", type=int, default=0, help="submit via /batch, N per request")
+    parser.add_argument(
+        "--fetch-batch-size", type=int, default=0, help="map.json batch_size (batched fetch)"
+    )
+    parser.add_argument("--generator-ms", type=float, default=0, help="fake PDF render latency")
+    parser.add_argument("--celery", choices=("eager", "worker"), default="eager")
+    parser.add_argument("--app-db", choices=("sqlite", "postgres"), default="sqlite")
+    parser.add_argument("--redis", default="fake", help='"fake" or a redis:// URL')
+    parser.add_argument("--workdir", help="directory for the SQLite files and templates")
+    parser.add_argument("--timeout", type=float, default=600, help="seconds to wait for workers")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output", help="write results to this JSON file")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+    if args.celery == "worker" and (args.redis == "fake" or args.app_db == "sqlite"):
+        parser.error("--celery worker needs --redis redis://... and --app-db postgres")
+
+    res = run(args)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            json.dump(res, fh, indent=2)
+    if args.json:
+        print(json.dumps(res, indent=2))
+    else:
+        print_results(res)
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as fh:
+            print_comparison(res, json.load(fh))
+
+
+if __name__ == "__main__":
+    main()
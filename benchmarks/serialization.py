@@ -0,0 +1,139 @@
+"""Compare Celery message sizes and encode/decode times on report-shaped payloads.
+
+Usage::
+
+    python -m benchmarks.serialization [--rows 5000] [--html-kb 2048] [--repeat 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import time
+from datetime import UTC, date, datetime, timedelta
+from decimal import Decimal
+
+os.environ.setdefault("SECRET_KEY", "benchmark")
+
+import numpy as np
+import pandas as pd
+from kombu.utils.json import dumps as json_dumps, loads as json_loads
+
+from app.core import serialization
+from app.core.config import settings
+
+
+def make_payload(rows: int, html_kb: int) -> dict:
+    rnd = random.Random(42)
+    start = date(2024, 1, 1)
+    table = [
+        {
+            "trade_date": start + timedelta(days=i % 365),
+            "instrument": f"ISIN{rnd.randrange(10**9):09d}",
+            "quantity": rnd.randrange(1, 10_000),
+            "price": Decimal(f"{rnd.uniform(1, 500):.4f}"),
+            "market_value": rnd.uniform(1e3, 1e7),
+            "currency": rnd.choice(["USD", "EUR", "CHF", "GBP"]),
+        }
+        for i in range(rows)
+    ]
+    row_html = "<tr><td>{}</td><td>{}</td><td class='num'>{:,.2f}</td></tr>\n"
+    html_rows = []
+    size = 0
+    while size < html_kb * 1024:
+        r = rnd.choice(table)
+        line = row_html.format(r["trade_date"], r["instrument"], r["market_value"])
+        html_rows.append(line)
+        size += len(line)
+    return {
+        "template_id": "positions_statement",
+        "report_id": "00000000-0000-0000-0000-000000000000",
+        "process_args": {"client_id": 1234, "as_of": "2024-12-31"},
+        "placeholders": {
+            "generated_at": datetime.now(UTC),
+            "positions": table,
+            "totals": {"market_value": sum(r["market_value"] for r in table)},
+        },
+        "html": "<table>\n" + "".join(html_rows) + "</table>",
+        "pdf_kwargs": {"page_size": "A4", "orientation": "L"},
+    }
+
+
+def check_round_trip() -> None:
+    """Values pandas and NumPy hand to templates that the JSON codec never had to carry."""
+    cases = {
+        "nat": (pd.NaT, None),
+        "na": (pd.NA, None),
+        "datetime64": (np.datetime64("2024-03-01T12:30:00"), datetime(2024, 3, 1, 12, 30)),
+        "datetime64_ns": (
+            np.datetime64("2024-03-01T12:30:00.000000500"),
+            datetime(2024, 3, 1, 12, 30),
+        ),
+        "datetime64_nat": (np.datetime64("NaT"), None),
+        "timedelta64": (np.timedelta64(90, "s"), timedelta(seconds=90)),
+        "int64": (np.int64(7), 7),
+        "float32": (np.float32(1.5), 1.5),
+        "bool_": (np.bool_(True), True),
+        "timestamp": (pd.Timestamp("2024-03-01 12:30"), datetime(2024, 3, 1, 12, 30)),
+    }
+    decoded = serialization.loads(serialization.dumps({k: v for k, (v, _) in cases.items()}))
+    for key, (_, expected) in cases.items():
+        if decoded[key] != expected:
+            raise AssertionError(f"{key}: expected {expected!r}, got {decoded[key]!r}")
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(rows: int, html_kb: int, repeat: int) -> list[dict]:
+    check_round_trip()
+    payload = make_payload(rows, html_kb)
+    codecs = {
+        "json": (lambda o: json_dumps(o).encode("utf-8"), lambda b: json_loads(b)),
+        "msgpack": (serialization.dumps, serialization.loads),
+    }
+    results = []
+    for compression in ("", "zlib", "zstd"):
+        for name, (enc, dec) in codecs.items():
+            if name == "json" and compression:
+                continue
+            settings.CELERY_COMPRESSION = compression
+            blob = enc(payload)
+            results.append(
+                {
+                    "codec": name + (f"+{compression}" if compression else ""),
+                    "bytes": len(blob),
+                    "encode_ms": round(_time(lambda enc=enc: enc(payload), repeat) * 1e3, 2),
+                    "decode_ms": round(_time(lambda dec=dec, b=blob: dec(b), repeat) * 1e3, 2),
+                }
+            )
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000, help="rows in the placeholder table")
+    parser.add_argument("--html-kb", type=int, default=2048, help="size of the rendered HTML")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.rows, args.html_kb, args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{'codec':<14}{'bytes':>12}{'encode ms':>12}{'decode ms':>12}")
+    for r in results:
+        print(f"{r['codec']:<14}{r['bytes']:>12,}{r['encode_ms']:>12}{r['decode_ms']:>12}")
+
+
+if __name__ == "__main__":
+    main()